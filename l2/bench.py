@@ -0,0 +1,124 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from network import (PING_STANDARD_SIZE, Sweep, T, ResultWriter, batch_reliability, capacity,
+                     conditioned_reliability, flow, gen_sparse_intensity_matrix, mesh_topology,
+                     profiled, reliability, total)
+
+
+ENGINES = {
+    "scalar": lambda G, N, T_max, p, m, trials, seed: reliability(G, N, T_max, p, m, iterations=trials, seed=seed),
+    "conditioned": lambda G, N, T_max, p, m, trials, seed:
+        conditioned_reliability(G, N, T_max, p, m, iterations=trials, seed=seed),
+    "batch": lambda G, N, T_max, p, m, trials, seed:
+        batch_reliability(G, N, T_max, p, m, iterations=trials, rng=np.random.default_rng(seed)),
+    "sweep": lambda G, N, T_max, p, m, trials, seed:
+        Sweep(G, p, iterations=trials, seed=seed).reliability(G, N, T_max, m),
+}
+
+
+def network(rows, cols, density, seed=None):
+    """Builds a mesh Network with its flows and capacities set
+
+    Args:
+        rows (Integer): number of rows of the mesh
+        cols (Integer): number of columns of the mesh
+        density (Float): number of demands per node
+        seed (int, optional): seed of the intensity matrix. Defaults to a fresh one.
+
+    Returns:
+        Tuple: networkx Graph and its intensity matrix
+    """
+    G = mesh_topology(rows, cols)
+    N = gen_sparse_intensity_matrix(G.nodes, max(1, round(density * rows * cols)), seed=seed)
+    N = {pair: volume*PING_STANDARD_SIZE for pair, volume in N.items()}
+    flow(G, N)
+    capacity(G)
+    return G, N
+
+
+def bench(engine, G, N, T_max, p, m, trials, seed=None, profile=False):
+    """Runs one reliability test and measures it
+
+    The test is run twice, the second time under tracemalloc only for its peak
+    memory, so tracing does not slow down the timed run.
+
+    Args:
+        engine (String): name of the engine in ENGINES
+        G (networkx Graph): Graph to be tested
+        N (Dict): intensity matrix of Bits per sec
+        T_max (Float): latency of a packet
+        p (Float): probability of an edge not failing
+        m (Integer): Avg. packet size in bits
+        trials (Integer): count of trials
+        seed (int, optional): seed of the failures. Defaults to a fresh one.
+        profile (bool, optional): time every phase of the timed run. Defaults to False.
+
+    Returns:
+        Dict: reliability, seconds, trials per second and peak memory in MiB of the test,
+        and the [seconds, count of calls] of every phase when profiled
+    """
+    test = ENGINES[engine]
+    if profile:
+        with profiled() as phases:
+            start = time.perf_counter()
+            result = test(G, N, T_max, p, m, trials, seed)
+            seconds = time.perf_counter() - start
+    else:
+        phases = None
+        start = time.perf_counter()
+        result = test(G, N, T_max, p, m, trials, seed)
+        seconds = time.perf_counter() - start
+    tracemalloc.start()
+    test(G, N, T_max, p, m, trials, seed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"reliability": result, "seconds": seconds, "trials_per_sec": trials / seconds,
+            "peak_mib": peak / 2**20, "phases": phases}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the reliability tests of a Network.")
+    parser.add_argument("--sizes", default="5x5,10x10,20x20", help="mesh sizes as ROWSxCOLS, comma separated")
+    parser.add_argument("--densities", default="1,4", help="demands per node, comma separated")
+    parser.add_argument("--trials", default="100,1000", help="counts of trials, comma separated")
+    parser.add_argument("--engines", default="scalar,batch,sweep", help=f"any of {', '.join(ENGINES)}")
+    parser.add_argument("-p", type=float, default=0.95, help="probability of an edge not failing")
+    parser.add_argument("-m", type=int, default=2, help="avg. packet size in bits")
+    parser.add_argument("--T-max-m", type=int, default=4, help="T_max is the latency of the intact Network at this packet size")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the matrices and the failures")
+    parser.add_argument("--profile", action="store_true", help="time every phase of the tests")
+    parser.add_argument("-o", "--output", help="CSV or Parquet file of the results")
+    args = parser.parse_args()
+
+    columns = {"engine": "string", "rows": "int64", "cols": "int64", "density": "float64", "trials": "int64",
+               "reliability": "float64", "seconds": "float64", "trials_per_sec": "float64", "peak_mib": "float64"}
+    writer = ResultWriter(args.output, columns) if args.output else None
+    print(f"{'engine':>12} {'size':>7} {'density':>7} {'trials':>7} {'R':>7} {'trials/s':>10} {'peak MiB':>9}")
+    try:
+        for size in args.sizes.split(","):
+            rows, cols = map(int, size.lower().split("x"))
+            for density in map(float, args.densities.split(",")):
+                G, N = network(rows, cols, density, args.seed)
+                T_max = T(G, total(N), args.T_max_m)
+                for trials in map(int, args.trials.split(",")):
+                    for engine in args.engines.split(","):
+                        row = bench(engine, G, N, T_max, args.p, args.m, trials, args.seed, args.profile)
+                        phases = row.pop("phases")
+                        print(f"{engine:>12} {size:>7} {density:>7g} {trials:>7} {row['reliability']:>7.4f} "
+                              f"{row['trials_per_sec']:>10.1f} {row['peak_mib']:>9.2f}")
+                        for phase, (seconds, calls) in sorted((phases or {}).items(), key=lambda item: -item[1][0]):
+                            print(f"{'':>12} {phase:>16} {seconds:>9.4f}s {calls:>8} calls")
+                        if writer is not None:
+                            row.update(engine=engine, rows=rows, cols=cols, density=density, trials=trials)
+                            writer.write(row)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == "__main__":
+    main()
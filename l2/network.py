@@ -1,28 +1,558 @@
 import networkx as nx
-import matplotlib.pyplot as plt
+import numpy as np
 import random
-from pick import pick
-from copy import deepcopy
-import pandas as pd
-import seaborn as sns
+from copy import copy
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import math
+import weakref
+import argparse
+import csv
+import json
+import time
+from contextlib import contextmanager
 
 PING_STANDARD_SIZE = 256
+# seconds and count of calls of every phase while profiled() is on, None otherwise
+PROFILE = None
+
+
+@contextmanager
+def profiled():
+    """Records the time spent in every phase of the reliability tests run inside the with block
+
+    Phases are only timed while profiling, otherwise each costs a single check.
+
+    Yields:
+        Dict: [seconds, count of calls] of every phase, filled in as the tests run
+    """
+    global PROFILE
+    previous = PROFILE
+    PROFILE = {}
+    try:
+        yield PROFILE
+    finally:
+        PROFILE = previous
+
+
+def record(phase, start):
+    """Adds the time since start to a phase of the profile
+
+    Args:
+        phase (String): name of the phase
+        start (Float): time.perf_counter() at the start of the phase
+
+    Returns:
+        Float: time.perf_counter() at the end of the phase
+    """
+    now = time.perf_counter()
+    entry = PROFILE.get(phase)
+    if entry is None:
+        PROFILE[phase] = entry = [0.0, 0]
+    entry[0] += now - start
+    entry[1] += 1
+    return now
+
+
+def ragged_range(starts, counts):
+    """Concatenates the ranges of given starts and lengths
+
+    Args:
+        starts (Integer Array): first value of every range
+        counts (Integer Array): length of every range
+
+    Returns:
+        Integer Array: values of all the ranges, one after another
+    """
+    offsets = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - np.repeat(offsets - starts, counts)
+
+
+def adjacency(node_count, heads, tails):
+    """Lists the neighbours of every node, lowest index first
+
+    Args:
+        node_count (Integer): number of nodes
+        heads (Integer Array): node index of one end of every edge
+        tails (Integer Array): node index of the other end of every edge
+
+    Returns:
+        Tuple: Integer Arrays with the neighbour and edge id of every entry, the position
+        of the first entry of every node and the degree of every node
+    """
+    node = np.concatenate([heads, tails])
+    neighbour = np.concatenate([tails, heads])
+    edge = np.concatenate([np.arange(len(heads)), np.arange(len(heads))])
+    order = np.lexsort((neighbour, node))
+    degree = np.bincount(node, minlength=node_count)
+    return neighbour[order], edge[order], np.cumsum(degree) - degree, degree
+
+
+def shortest_path_trees(node_count, heads, tails, alive, destinations):
+    """Finds shortest-path trees towards many destinations at once
+
+    All the trees are grown by one breadth-first search that only ever looks
+    at the edges of its frontier. Ties between equally short paths are broken
+    towards the lower node index.
+
+    Args:
+        node_count (Integer): number of nodes
+        heads (Integer Array): node index of one end of every edge
+        tails (Integer Array): node index of the other end of every edge
+        alive (Bool Array): edges present in the topology, or a 2D array with one row per tree
+        destinations (Integer Array): node index of the root of every tree
+
+    Returns:
+        Tuple: distance, next hop edge id and next node index of every node in every tree
+        as 2D Integer Arrays, -1 where there is no route
+    """
+    rows = np.arange(len(destinations))
+    alive = np.broadcast_to(alive, (len(destinations), len(heads)))
+    distance = np.full((len(destinations), node_count), -1, dtype=np.intp)
+    distance[rows, destinations] = 0
+    next_edge = np.full(distance.shape, -1, dtype=np.intp)
+    next_node = np.full(distance.shape, -1, dtype=np.intp)
+    neighbour, edge, first_edge, degree = adjacency(node_count, heads, tails)
+    tree, frontier = rows, np.asarray(destinations, dtype=np.intp)
+    level = 0
+    while tree.size:
+        level += 1
+        counts = degree[frontier]
+        position = ragged_range(first_edge[frontier], counts)
+        tree, parent = np.repeat(tree, counts), np.repeat(frontier, counts)
+        child, via = neighbour[position], edge[position]
+        new = alive[tree, via] & (distance[tree, child] < 0)
+        tree, parent, child, via = tree[new], parent[new], child[new], via[new]
+        # the frontier is sorted, so the first parent found for a child has the lowest index
+        discovered, first = np.unique(tree * node_count + child, return_index=True)
+        tree, frontier = np.divmod(discovered, node_count)
+        distance[tree, frontier] = level
+        next_edge[tree, frontier] = via[first]
+        next_node[tree, frontier] = parent[first]
+    return distance, next_edge, next_node
+
+
+class RoutingTable(object):
+    """Shortest-path routes between every pair of nodes of a Graph.
+
+    Routes towards a destination form a shortest-path tree that is computed
+    once, on first use. Ties between equally short paths are broken towards
+    the lower node index, so every route is the same one on each call.
+    """
+
+    def __init__(self, graph):
+        """Initialize a RoutingTable for the current topology of the given Graph."""
+        self.nodes = list(graph.nodes)
+        self.node_index = {node: k for k, node in enumerate(self.nodes)}
+        self.edges = list(graph.edges)
+        self.edge_index = {}
+        for k, (i, j) in enumerate(self.edges):
+            self.edge_index[i, j] = k
+            self.edge_index[j, i] = k
+        self.heads = np.array([self.node_index[i] for i, _ in self.edges], dtype=np.intp)
+        self.tails = np.array([self.node_index[j] for _, j in self.edges], dtype=np.intp)
+        self.removed = frozenset()
+        self._trees = {}
+        self._routed = None
+
+    def __deepcopy__(self, memo):
+        # a table never changes after it is built, copies of a Graph can share it
+        return self
+
+    def matches(self, graph):
+        """Check if the table was built for the current topology of the Graph."""
+        if graph.number_of_edges() != len(self.edges) - len(self.removed):
+            return False
+        for edge in graph.edges:
+            k = self.edge_index.get(edge)
+            if k is None or k in self.removed:
+                return False
+        return True
+
+    def without(self, removed):
+        """Get the table of the topology left after removing some edges.
+
+        Edge ids stay the same and trees that used none of the removed edges
+        are kept, as their routes are still the shortest ones.
+
+        Args:
+            removed (Iterable): ids of the removed edges
+
+        Returns:
+            RoutingTable: routes over the remaining edges
+        """
+        removed = frozenset(removed) - self.removed
+        table = copy(self)
+        table.removed = self.removed | removed
+        # the padding False answers for the -1 of nodes without a next hop
+        hit = np.zeros(len(self.edges) + 1, dtype=bool)
+        hit[list(removed)] = True
+        table._trees = {d: tree for d, tree in self._trees.items() if not hit[tree[0]].any()}
+        table._routed = None
+        return table
+
+    def grow(self, destinations):
+        """Compute the shortest-path trees towards many destinations at once.
+
+        Args:
+            destinations (List): indexes of the destination nodes
+        """
+        alive = np.ones(len(self.edges), dtype=bool)
+        alive[list(self.removed)] = False
+        chunk = max(1, 2 ** 22 // max(1, 2 * len(self.edges)))
+        for first in range(0, len(destinations), chunk):
+            targets = np.array(destinations[first:first + chunk], dtype=np.intp)
+            _, next_edge, next_node = shortest_path_trees(len(self.nodes), self.heads, self.tails, alive, targets)
+            for row, destination in enumerate(targets.tolist()):
+                self._trees[destination] = (next_edge[row], next_node[row])
+
+    def tree(self, destination):
+        """Get the shortest-path tree towards a destination.
+
+        Args:
+            destination (Integer): index of the destination node
+
+        Returns:
+            Tuple: next hop edge id and next node index of every node index, -1 if there is no route
+        """
+        if destination not in self._trees:
+            self.grow([destination])
+        return self._trees[destination]
+
+    def path(self, i, j):
+        """Get the edge ids of the route from node i to node j.
+
+        Args:
+            i (Integer): ID of a Node in Graph from
+            j (Integer): ID of a Node in Graph to
+
+        Returns:
+            List: edge ids along the route, in order
+        """
+        source, destination = self.node_index[i], self.node_index[j]
+        next_edge, next_node = self.tree(destination)
+        path = []
+        node = source
+        while node != destination:
+            if next_edge[node] < 0:
+                raise nx.NetworkXNoPath(f"No path between {i} and {j}.")
+            path.append(int(next_edge[node]))
+            node = next_node[node]
+        return path
+
+    def walk(self, pairs):
+        """Follow the routes of many demands at once.
+
+        Args:
+            pairs (List): (i, j) node pairs of the demands
+
+        Returns:
+            Tuple: edge_ids and demand_ids Integer arrays, demand demand_ids[n] is routed over edge edge_ids[n]
+        """
+        edge_ids, demand_ids = [], []
+        if pairs:
+            sources = np.array([self.node_index[i] for i, _ in pairs], dtype=np.intp)
+            destinations = np.array([self.node_index[j] for _, j in pairs], dtype=np.intp)
+            unique, inverse = np.unique(destinations, return_inverse=True)
+            self.grow([d for d in unique.tolist() if d not in self._trees])
+            trees = [self._trees[d] for d in unique.tolist()]
+            next_edge = np.stack([tree[0] for tree in trees])
+            next_node = np.stack([tree[1] for tree in trees])
+            demand = np.flatnonzero(sources != destinations)
+            node, trees = sources[demand], inverse.reshape(-1)[demand]
+            while demand.size:
+                k = next_edge[trees, node]
+                if (k < 0).any():
+                    i, j = pairs[demand[np.argmax(k < 0)]]
+                    raise nx.NetworkXNoPath(f"No path between {i} and {j}.")
+                edge_ids.append(k)
+                demand_ids.append(demand)
+                node = next_node[trees, node]
+                going = node != destinations[demand]
+                demand, node, trees = demand[going], node[going], trees[going]
+        if not edge_ids:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        return np.concatenate(edge_ids), np.concatenate(demand_ids)
+
+    def incidence(self, pairs):
+        """Get the edge x demand routing incidence of the given demands.
+
+        The incidence is kept in coordinate form: demand demand_ids[n] is
+        routed over edge edge_ids[n]. It is cached for the last list of pairs.
+
+        Args:
+            pairs (List): (i, j) node pairs of the demands
+
+        Returns:
+            Tuple: edge_ids and demand_ids Integer arrays
+        """
+        if self._routed is None or self._routed[0] != pairs:
+            self._routed = (list(pairs), *self.walk(pairs))
+        return self._routed[1], self._routed[2]
+
+    def load(self, pairs, volumes):
+        """Get the flow of every edge when the demands follow their routes.
+
+        Args:
+            pairs (List): (i, j) node pairs of the demands
+            volumes (Array): Bits per sec of every demand
+
+        Returns:
+            Array: flow of every edge, indexed by edge id
+        """
+        edge_ids, demand_ids = self.incidence(pairs)
+        flows = np.bincount(edge_ids, weights=volumes[demand_ids], minlength=len(self.edges))
+        return flows.astype(volumes.dtype)
+
+    def reroute(self, removed, pairs, volumes):
+        """Route again only the demands whose route used a removed edge.
+
+        Args:
+            removed (Iterable): ids of the removed edges
+            pairs (List): (i, j) node pairs of the demands
+            volumes (Array): Bits per sec of every demand
+
+        Returns:
+            Tuple: RoutingTable without the removed edges and the change of flow of every edge
+        """
+        table = self.without(removed)
+        edge_ids, demand_ids = self.incidence(pairs)
+        hit = np.zeros(len(self.edges), dtype=bool)
+        hit[list(table.removed - self.removed)] = True
+        affected = np.zeros(len(pairs), dtype=bool)
+        affected[demand_ids[hit[edge_ids]]] = True
+        moved = affected[demand_ids]
+        affected = np.flatnonzero(affected)
+        new_edge_ids, new_demand_ids = table.walk([pairs[d] for d in affected.tolist()])
+        new_demand_ids = affected[new_demand_ids]
+        table._routed = (list(pairs),
+                         np.concatenate([edge_ids[~moved], new_edge_ids]),
+                         np.concatenate([demand_ids[~moved], new_demand_ids]))
+        delta = (np.bincount(new_edge_ids, weights=volumes[new_demand_ids], minlength=len(self.edges))
+                 - np.bincount(edge_ids[moved], weights=volumes[demand_ids[moved]], minlength=len(self.edges)))
+        return table, delta.astype(volumes.dtype)
+
+
+def routing(graph):
+    """Gets the RoutingTable of a Graph, building it only when the topology changed
+
+    Args:
+        graph (networkx Graph): Graph to route over
+
+    Returns:
+        RoutingTable: routes over the current topology of the Graph
+    """
+    table = graph.graph.get("routing")
+    if table is None or not table.matches(graph):
+        table = RoutingTable(graph)
+        graph.graph["routing"] = table
+    return table
+
+
+class EdgeAttributes(object):
+    """Flow and capacity of every edge of a Graph.
+
+    The values are kept in arrays indexed by the edge ids of the RoutingTable
+    of the Graph, the Graph itself only holds the topology. Removed edges keep
+    their values, but are left out of every calculation.
+    """
+
+    def __init__(self, table, flow=None, capacity=None):
+        """Initialize the EdgeAttributes of the edges of a RoutingTable, 0 where no value is given."""
+        self.table = table
+        self.flow = np.zeros(len(table.edges)) if flow is None else np.asarray(flow, dtype=float)
+        self.capacity = np.zeros(len(table.edges)) if capacity is None else np.asarray(capacity, dtype=float)
+        self.owner = None
+
+    def __getstate__(self):
+        # the owner is only known in the process that set it
+        state = dict(self.__dict__)
+        state["owner"] = None
+        return state
+
+    def copy(self):
+        """Get a copy with its own arrays."""
+        return EdgeAttributes(self.table, self.flow.copy(), self.capacity.copy())
+
+    def index(self, i, j):
+        """Get the edge id of the edge between node i and node j."""
+        return self.table.edge_index[i, j]
+
+    def alive(self):
+        """Get the mask of the edges that were not removed."""
+        alive = np.ones(len(self.table.edges), dtype=bool)
+        alive[list(self.table.removed)] = False
+        return alive
+
+    def reindex(self, table):
+        """Lay the values out by the edge ids of another RoutingTable, 0 for the edges that are new.
+
+        Args:
+            table (RoutingTable): routes over the new topology
+
+        Returns:
+            EdgeAttributes: values of the edges of the new topology
+        """
+        ids = np.array([self.table.edge_index.get(edge, -1) for edge in table.edges], dtype=np.intp)
+        known = ids >= 0
+        flow, capacity = np.zeros(len(ids)), np.zeros(len(ids))
+        flow[known] = self.flow[ids[known]]
+        capacity[known] = self.capacity[ids[known]]
+        return EdgeAttributes(table, flow, capacity)
+
+    def values(self, name, table):
+        """Get the values of an attribute laid out by the edge ids of a RoutingTable.
+
+        Args:
+            name (String): "flow" or "capacity"
+            table (RoutingTable): routes over the same edges or some of them
+
+        Returns:
+            Float Array: value of every edge of the table
+        """
+        values = getattr(self, name)
+        if table.edges is self.table.edges:
+            return values
+        return values[[self.table.edge_index[edge] for edge in table.edges]]
+
+
+def attributes(graph):
+    """Gets the EdgeAttributes of a Graph, laid out for its current topology
+
+    A Graph without them starts from the "flow" and "capacity" of its edges. A
+    copy of a Graph gets its own copy of the values on first use.
+
+    Args:
+        graph (networkx Graph): Graph holding the topology
+
+    Returns:
+        EdgeAttributes: flow and capacity of every edge
+    """
+    table = routing(graph)
+    store = graph.graph.get("attributes")
+    if store is None:
+        store = EdgeAttributes(table, [graph[i][j].get("flow", 0) for i, j in table.edges],
+                               [graph[i][j].get("capacity", 0) for i, j in table.edges])
+    elif store.owner is not None and store.owner() is not graph:
+        store = store.copy()
+    if store.table is not table:
+        if store.table.edges is table.edges:
+            store.table = table
+        else:
+            store = store.reindex(table)
+    store.owner = weakref.ref(graph)
+    graph.graph["attributes"] = store
+    return store
+
+
+def sparse(matrix):
+    """Converts an intensity matrix to its sparse form
+
+    The sparse form is a Dict of the Bits per sec of every non-zero demand keyed
+    by its (i, j) node pair. It can be used anywhere in place of a 2D list.
+
+    Args:
+        matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+
+    Returns:
+        Dict: Bits per sec keyed by (i, j) node pairs, a new Dict even if the matrix is one already
+    """
+    pairs, volumes = demands(matrix)
+    return dict(zip(pairs, volumes.tolist()))
+
+
+def demands(matrix):
+    """Lists the non-zero demands of an intensity matrix
+
+    Args:
+        matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+
+    Returns:
+        Tuple: list of (i, j) node pairs and array of their Bits per sec
+    """
+    pairs, volumes = [], []
+    if isinstance(matrix, dict):
+        items = matrix.items()
+    else:
+        items = (((i, j), volume) for i, row in enumerate(matrix) for j, volume in enumerate(row))
+    for (i, j), volume in items:
+        if volume and i != j:
+            pairs.append((i, j))
+            volumes.append(volume)
+    return pairs, np.array(volumes)
+
+
+def total(matrix):
+    """Sums all the elements of an intensity matrix
+
+    Args:
+        matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+
+    Returns:
+        Integer: Sum of all the elements in intensity matrix
+    """
+    if isinstance(matrix, dict):
+        return sum(matrix.values())
+    return sum(sum(row) for row in matrix)
+
+
+def intensity(table, matrix):
+    """Keys the demands of an intensity matrix by the node indexes of a RoutingTable
+
+    Args:
+        table (RoutingTable): routes the matrix is sent over
+        matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+
+    Returns:
+        Dict: Bits per sec keyed by (i, j) node indexes
+    """
+    pairs, volumes = demands(matrix)
+    sent = {}
+    for (i, j), volume in zip(pairs, volumes.tolist()):
+        key = table.node_index[i], table.node_index[j]
+        sent[key] = sent.get(key, 0) + volume
+    return sent
 
 
 def flow(graph, matrix):
     """Generates flow and assigns it to a Graph from given intensity matrix
 
+    Every demand follows a shortest path of the RoutingTable, where ties between
+    equally short paths go towards the lower node index.
+
     Args:
         graph (networkx Graph): Graph to assign flow to
         matrix (2D Integer List): intensity matrix of Bits per sec for a route for node i to j
     """
-    nx.set_edge_attributes(graph, 0, "flow")
-    node_count = nx.number_of_nodes(graph)
-    for i in range(node_count):
-        for j in range(node_count):
-            path = nx.shortest_path(graph, i, j)
-            for n in range(len(path) - 1):
-                graph[path[n]][path[n + 1]]["flow"] += matrix[i][j]
+    store = attributes(graph)
+    pairs, volumes = demands(matrix)
+    store.flow = store.table.load(pairs, volumes).astype(float)
+
+
+def reroute(graph, matrix, removed):
+    """Moves the flow of the routes that used removed edges onto new shortest paths
+
+    Gives the same flow as flow(), but only the demands that lost an edge are
+    routed again. The Graph has to carry the flow of the matrix from before the
+    removal, as left by flow() or reroute(), otherwise the flow is generated anew.
+
+    Args:
+        graph (networkx Graph): Graph the edges were already removed from
+        matrix (2D Integer List): intensity matrix of Bits per sec for a route for node i to j
+        removed (List): removed edges
+    """
+    table = graph.graph.get("routing")
+    if table is None or not all(edge in table.edge_index for edge in removed):
+        flow(graph, matrix)
+        return
+    pairs, volumes = demands(matrix)
+    table, delta = table.reroute([table.edge_index[edge] for edge in removed], pairs, volumes)
+    if not table.matches(graph):
+        flow(graph, matrix)
+        return
+    graph.graph["routing"] = table
+    store = attributes(graph)
+    store.flow = store.flow + delta
 
 
 def capacity(graph):
@@ -31,9 +561,8 @@ def capacity(graph):
     Args:
         graph (networkx Graph): Graph to assign capacity to 
     """
-    nx.set_edge_attributes(graph, 0, "capacity")
-    for i, j in graph.edges:
-        graph[i][j]["capacity"] = ((graph[i][j]["flow"] * 10) + PING_STANDARD_SIZE)
+    store = attributes(graph)
+    store.capacity = (store.flow * 10) + PING_STANDARD_SIZE
 
 def T(graph, matrix_sum, m):
     """Calculates avg. latency of a packet in a given Network
@@ -46,48 +575,284 @@ def T(graph, matrix_sum, m):
     Returns:
         Float: avg. latency of a packet
     """
-    T = 0
-    #print(matrix_sum)
-    for i, j in graph.edges:
-        a = graph[i][j]["flow"]
-        c = graph[i][j]["capacity"]
-        if a >= c / m:
-            #print("None")
-            return None
+    store = attributes(graph)
+    a, c = store.flow, store.capacity
+    if store.table.removed:
+        alive = store.alive()
+        a, c = a[alive], c[alive]
+    if (a >= c / m).any():
+        return None
+    return np.sum(a / (c / m - a)).item() / matrix_sum
+
+
+class Connectivity(object):
+    """Tells if a Graph stays connected while its edges fail.
+
+    Bridges of the intact Graph are found once: losing one always disconnects
+    the Graph and losing a single other edge never does. Only the remaining
+    cases look at the edges that are left.
+    """
+
+    def __init__(self, node_count, heads, tails):
+        """Initialize a Connectivity of the intact Graph given by its edges."""
+        self.node_count = node_count
+        self.heads = heads
+        self.tails = tails
+        graph = nx.Graph()
+        graph.add_nodes_from(range(node_count))
+        graph.add_edges_from(zip(heads.tolist(), tails.tolist()))
+        edge_index = {}
+        for k, (i, j) in enumerate(zip(heads.tolist(), tails.tolist())):
+            edge_index[i, j] = edge_index[j, i] = k
+        self.bridge = np.zeros(len(heads), dtype=bool)
+        self.bridge[[edge_index[edge] for edge in nx.bridges(graph)]] = True
+        self.intact = nx.is_connected(graph) if node_count else True
+
+    def first_disconnection(self, fails, intervals):
+        """Finds the first interval of a trial in which the Graph is no longer connected
+
+        Edges are added back from the last failure to the first one into a
+        union-find, so the whole trial costs a single pass over its edges.
+
+        Args:
+            fails (Integer Array): interval in which every edge fails, above intervals if it never does
+            intervals (Integer): number of intervals
+
+        Returns:
+            Integer: first disconnected interval, intervals + 1 if the Graph stays connected
+        """
+        fails = np.minimum(fails, intervals + 1)
+        if fails.min() > intervals:
+            return 1 if not self.intact else intervals + 1
+        if not self.bridge[fails <= intervals].any() and (fails <= intervals).sum() == 1:
+            return intervals + 1
+        parent = list(range(self.node_count))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        components = self.node_count
+        first = level = intervals + 1
+        order = np.argsort(-fails, kind="stable")
+        for k, i, j in zip(fails[order].tolist(), self.heads[order].tolist(), self.tails[order].tolist()):
+            if k < level:
+                # the edges added so far are the ones alive in intervals k to level - 1
+                if components <= 1:
+                    return first
+                first = level = k
+            i, j = find(i), find(j)
+            if i != j:
+                parent[i] = j
+                components -= 1
+        return 1 if components > 1 else first
+
+    def connected(self, alive):
+        """Checks which of many sets of alive edges connect every node
+
+        Args:
+            alive (2D Bool Array): alive edges, one row per set
+
+        Returns:
+            Bool Array: True for every row that connects every node
+        """
+        dead = ~alive
+        connected = ~(dead & self.bridge).any(axis=1) & self.intact
+        undecided = np.flatnonzero(connected & (dead.sum(axis=1) > 1))
+        if undecided.size:
+            rows, edges = np.nonzero(alive[undecided])
+            heads, tails = self.heads[edges], self.tails[edges]
+            labels = np.tile(np.arange(self.node_count), (undecided.size, 1))
+            while True:
+                # hook the root of the higher label under the lower one, then jump to the roots
+                head_labels, tail_labels = labels[rows, heads], labels[rows, tails]
+                if (head_labels == tail_labels).all():
+                    break
+                low = np.minimum(head_labels, tail_labels)
+                np.minimum.at(labels, (rows, head_labels), low)
+                np.minimum.at(labels, (rows, tail_labels), low)
+                while True:
+                    jumped = np.take_along_axis(labels, labels, axis=1)
+                    if (jumped == labels).all():
+                        break
+                    labels = jumped
+            connected[undecided] = (labels == 0).all(axis=1)
+        return connected
+
+
+class Trial(object):
+    """Edge failures of one trial of reliability() over a shared Graph.
+
+    The Graph is never changed. A trial only keeps which edges are still alive
+    and the flow of every edge, in arrays indexed by the edge ids of the
+    RoutingTable of the Graph.
+    """
+
+    def __init__(self, graph, matrix):
+        """Initialize a Trial with every edge of the Graph alive and its current flow."""
+        table = routing(graph)
+        if table.removed:
+            table = RoutingTable(graph)
+        self.table = self.base_table = table
+        self.pairs, self.volumes = demands(matrix)
+        edges = self.table.edges
+        store = attributes(graph)
+        self.base_flows = store.values("flow", self.table).copy()
+        self.capacities = store.values("capacity", self.table).copy()
+        self.connectivity = Connectivity(len(self.table.nodes), self.table.heads, self.table.tails)
+        self.fails = np.zeros(len(edges), dtype=np.intp)
+        self.disconnected = 1
+        self.restart()
+
+    def restart(self, rand=None, p=1, intervals=0, conditioned=False):
+        """Bring back every edge and the flow of the Graph and draw the failures of a new trial.
+
+        In every interval each alive edge fails with probability 1 - p, drawn
+        in the order of the Graph edges.
+
+        Args:
+            rand (random.Random, optional): source of the failures. Defaults to no failures.
+            p (Float, optional): probability of an edge not failing. Defaults to 1.
+            intervals (int, optional): number of intervals. Defaults to 0.
+            conditioned (bool, optional): draw the first interval given that some edge fails in it. Defaults to False.
+        """
+        # the restart of a new Trial draws nothing and is not a trial of its own
+        profile = PROFILE is not None and rand is not None
+        if profile:
+            clock = time.perf_counter()
+        self.table = self.base_table
+        self.alive = np.ones(len(self.table.edges), dtype=bool)
+        self.flows = self.base_flows
+        self.fails[:] = intervals + 1
+        alive = list(range(len(self.fails)))
+        for k in range(1, intervals + 1):
+            if k == 1 and conditioned and alive and p < 1:
+                # the first failing edge j comes with probability p^j (1 - p), the edges after it as usual
+                q = 1 - p ** len(alive)
+                first = int(math.log1p(-rand.random() * q) / math.log(p)) if p > 0 else 0
+                first = min(first, len(alive) - 1)
+                failed = [alive[first]] + [e for e in alive[first + 1:] if rand.random() > p]
+            else:
+                failed = [e for e in alive if rand.random() > p]
+            if failed:
+                self.fails[failed] = k
+                failed = set(failed)
+                alive = [e for e in alive if e not in failed]
+        if profile:
+            clock = record("draw", clock)
+        self.disconnected = self.connectivity.first_disconnection(self.fails, intervals)
+        if profile:
+            record("connectivity", clock)
+
+    def broken(self, interval):
+        """Get the ids of the edges failing in an interval."""
+        return np.flatnonzero(self.fails == interval).tolist()
+
+    def remove(self, broken, incremental=True):
+        """Remove failed edges and route the flow over the remaining ones.
+
+        Args:
+            broken (List): ids of the failed edges
+            incremental (bool, optional): reroute only the flow of broken routes. Defaults to True.
+        """
+        self.alive[broken] = False
+        if incremental:
+            self.table, delta = self.table.reroute(broken, self.pairs, self.volumes)
+            self.flows = self.flows + delta
         else:
-            T += a / (c / m - a)
-    #print(T / matrix_sum)
-    return T / matrix_sum
+            self.table = self.table.without(broken)
+            self.flows = self.table.load(self.pairs, self.volumes)
 
+    def T(self, matrix_sum, m):
+        """Calculates avg. latency of a packet over the remaining edges, as T() does for a Graph"""
+        a = self.flows[self.alive]
+        c = self.capacities[self.alive]
+        if (a >= c / m).any():
+            return None
+        return np.sum(a / (c / m - a)).item() / matrix_sum
 
-def reliability(graph, matrix, T_max, p, m, iterations=100, intervals=10):
-    """Tests the reliability of the Network
+
+def confidence_interval(estimate, iterations, confidence=0.95):
+    """Calculates the Wilson score interval of a reliability estimate
+
+    The share of successful intervals of a trial lies between 0 and 1, so its
+    variance is at most that of a single success or failure and the interval
+    holds even when every trial gave the same result.
+
+    Args:
+        estimate (Float): reliability of the Network
+        iterations (Integer): count of trials behind the estimate
+        confidence (float, optional): probability of the interval holding the reliability. Defaults to 0.95.
+
+    Returns:
+        Tuple: lowest and highest reliability of the interval
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    scale = 1 + z * z / iterations
+    center = (estimate + z * z / (2 * iterations)) / scale
+    spread = z * (estimate * (1 - estimate) / iterations + z * z / (4 * iterations * iterations)) ** 0.5 / scale
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+
+def trial_seeds(seed, iterations):
+    """Derives an independent seed for every trial from one master seed
+
+    Args:
+        seed (Integer or numpy SeedSequence): master seed, None draws a fresh one
+        iterations (Integer): count of trials
+
+    Returns:
+        Integer List: seed of every trial
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [int(child.generate_state(1, np.uint64)[0]) for child in seed.spawn(iterations)]
+
+
+def trials(graph, matrix, T_max, p, m, seeds, intervals=10, incremental=True, conditioned=False):
+    """Runs the trials of reliability() seeded with the given seeds
 
     Args:
         graph (networkx Graph): Graph to be tested
-        matrix (2D Integer List): intensity matrix of Bits per sec for a route for node i to j
-        T_max (Integer): latency of a packet 
+        matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+        T_max (Integer): latency of a packet
         p (Float):  probability of an edge not failing
         m (Integer): Avg. packet size in bits
-        iterations (int, optional): count of iteration in a test. Defaults to 100.
+        seeds (Integer List): seed of every trial
         intervals (int, optional): number of intervals. Defaults to 10.
+        incremental (bool, optional): reroute only the flow of broken routes. Defaults to True.
+        conditioned (bool, optional): make some edge fail in the first interval of every trial. Defaults to False.
 
     Returns:
-        Float: reliability of the Network
+        Integer List: count of trials by their number of successful intervals
     """
-    successful_trials = 0
-    matrix_sum = sum(sum(row) for row in matrix)
+    profile = PROFILE is not None
+    if profile:
+        clock = time.perf_counter()
+    counts = [0] * (intervals + 1)
+    matrix_sum = total(matrix)
     base_t = T(graph, matrix_sum, m)
-    for _ in range(iterations):
-        trial_graph = deepcopy(graph)
-        for _ in range(intervals):
-            broken = [e for e in nx.edges(trial_graph) if random.random() > p]
+    trial = Trial(graph, matrix)
+    if profile:
+        record("setup", clock)
+    for seed in seeds:
+        trial.restart(random.Random(seed), p, intervals, conditioned)
+        successful = 0
+        for k in range(1, intervals + 1):
+            broken = trial.broken(k)
             if broken:
-                trial_graph.remove_edges_from(broken)
-                if not nx.is_connected(trial_graph):
+                if k >= trial.disconnected:
                     break
-                flow(trial_graph, matrix)
-                t = T(trial_graph, matrix_sum, m)
+                if profile:
+                    clock = time.perf_counter()
+                trial.remove(broken, incremental)
+                if profile:
+                    clock = record("reroute", clock)
+                t = trial.T(matrix_sum, m)
+                if profile:
+                    record("latency", clock)
                 #print(t)
             else:
                 t = base_t
@@ -95,10 +860,773 @@ def reliability(graph, matrix, T_max, p, m, iterations=100, intervals=10):
             if not t or t >= T_max:
                 #print("wrong")
                 break
-            successful_trials += 1
+            successful += 1
+        counts[successful] += 1
+    return counts
+
+
+def run_trials(graph, matrix, T_max, p, m, seeds, intervals, incremental, conditioned=False, executor=None, workers=1):
+    """Runs trials(), split between the workers of an executor if one is given
+
+    Returns:
+        Integer List: count of trials by their number of successful intervals
+    """
+    if executor is None or len(seeds) <= 1:
+        return trials(graph, matrix, T_max, p, m, seeds, intervals, incremental, conditioned)
+    chunk = -(-len(seeds) // (workers * 4))
+    job = trials if PROFILE is None else profiled_trials
+    futures = [executor.submit(job, graph, matrix, T_max, p, m, seeds[i:i + chunk], intervals, incremental, conditioned)
+               for i in range(0, len(seeds), chunk)]
+    results = [future.result() for future in futures]
+    if PROFILE is not None:
+        for _, profile in results:
+            for phase, (seconds, calls) in profile.items():
+                entry = PROFILE.setdefault(phase, [0.0, 0])
+                entry[0] += seconds
+                entry[1] += calls
+        results = [counts for counts, _ in results]
+    return [sum(counts) for counts in zip(*results)]
+
+
+def profiled_trials(*args):
+    """Runs trials() in a worker and brings back its profile along with its counts"""
+    with profiled() as profile:
+        counts = trials(*args)
+    return counts, profile
+
+
+def reliability(graph, matrix, T_max, p, m, iterations=100, intervals=10, incremental=True, seed=None, workers=None,
+                width=None, confidence=0.95, max_iterations=10000):
+    """Tests the reliability of the Network
+
+    Every trial draws its failures from its own stream derived from the seed, so
+    the result depends only on the seed and not on the number of workers. Given
+    a width, trials are run in blocks of iterations until the confidence interval
+    of the estimate is no wider or max_iterations trials were run.
+
+    Args:
+        graph (networkx Graph): Graph to be tested
+        matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+        T_max (Integer): latency of a packet 
+        p (Float):  probability of an edge not failing
+        m (Integer): Avg. packet size in bits
+        iterations (int, optional): count of iteration in a test, or in a block of them. Defaults to 100.
+        intervals (int, optional): number of intervals. Defaults to 10.
+        incremental (bool, optional): reroute only the flow of broken routes. Defaults to True.
+        seed (int, optional): master seed of the test. Defaults to a fresh one.
+        workers (int, optional): number of processes running the trials. Defaults to one.
+        width (float, optional): widest confidence interval to stop at. Defaults to a fixed count of iterations.
+        confidence (float, optional): confidence of the interval. Defaults to 0.95.
+        max_iterations (int, optional): most trials to run for a width. Defaults to 10000.
+
+    Returns:
+        Float: reliability of the Network, or with a width a Tuple of it, its confidence
+        interval and the count of trials run
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    executor = ProcessPoolExecutor(workers) if workers and workers > 1 else None
+    successful_trials = done = 0
+    try:
+        while True:
+            block = iterations if width is None else max(1, min(iterations, max_iterations - done))
+            counts = run_trials(graph, matrix, T_max, p, m, trial_seeds(seed, block), intervals, incremental,
+                                executor=executor, workers=workers)
+            successful_trials += sum(s * count for s, count in enumerate(counts))
+            done += block
+            estimate = successful_trials / (done * intervals)
+            if width is None:
+                return estimate
+            low, high = confidence_interval(estimate, done, confidence)
+            if high - low <= width or done >= max_iterations:
+                return estimate, (low, high), done
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def conditioned_reliability(graph, matrix, T_max, p, m, iterations=100, intervals=10, incremental=True, seed=None,
+                            workers=None, width=None, confidence=0.95, max_iterations=10000):
+    """Tests the reliability of a Network whose edges rarely fail
+
+    Intervals before the first failure of a trial are all like the intact
+    Network, so the interval K of the first failure is not sampled: every
+    value of K is weighed by its probability 1 - p^E per interval. Trials are
+    only drawn for what follows a failure, given that some edge fails in their
+    first interval, so no trial is spent on a Network that never fails. For p
+    close to 1 this needs far fewer trials than reliability() for the same
+    accuracy, and it estimates the same reliability.
+
+    Args:
+        graph (networkx Graph): Graph to be tested
+        matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+        T_max (Integer): latency of a packet
+        p (Float):  probability of an edge not failing
+        m (Integer): Avg. packet size in bits
+        iterations (int, optional): count of iteration in a test, or in a block of them. Defaults to 100.
+        intervals (int, optional): number of intervals. Defaults to 10.
+        incremental (bool, optional): reroute only the flow of broken routes. Defaults to True.
+        seed (int, optional): master seed of the test. Defaults to a fresh one.
+        workers (int, optional): number of processes running the trials. Defaults to one.
+        width (float, optional): widest confidence interval to stop at. Defaults to a fixed count of iterations.
+        confidence (float, optional): confidence of the interval. Defaults to 0.95.
+        max_iterations (int, optional): most trials to run for a width. Defaults to 10000.
+
+    Returns:
+        Float: reliability of the Network, or with a width a Tuple of it, its confidence
+        interval and the count of trials run
+    """
+    base_t = T(graph, total(matrix), m)
+    base_ok = bool(base_t) and base_t < T_max
+    q = 1 - p ** graph.number_of_edges()
+    # chance of the first failure in interval k, a trial without failures passes every interval
+    first = [(1 - q) ** (k - 1) * q for k in range(1, intervals + 1)]
+    if base_ok:
+        exact = sum(chance * (k - 1) for k, chance in enumerate(first, 1)) + (1 - q) ** intervals * intervals
+        weights = first
+    else:
+        exact = 0
+        weights = first[:1]
+    # with the first failure in interval k, a trial passes its successful intervals up to the last one
+    value = [sum(chance * min(s, intervals - k) for k, chance in enumerate(weights)) for s in range(intervals + 1)]
+    if q <= 0 or value[-1] <= 0:
+        estimate = exact / intervals
+        return estimate if width is None else (estimate, (estimate, estimate), 0)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    executor = ProcessPoolExecutor(workers) if workers and workers > 1 else None
+    counts = [0] * (intervals + 1)
+    done = 0
+    try:
+        while True:
+            block = iterations if width is None else max(1, min(iterations, max_iterations - done))
+            more = run_trials(graph, matrix, T_max, p, m, trial_seeds(seed, block), intervals, incremental,
+                              conditioned=True, executor=executor, workers=workers)
+            counts = [a + b for a, b in zip(counts, more)]
+            done += block
+            # a trial adds value[s] / intervals, which lies between 0 and value[-1] / intervals,
+            # so its share of value[-1] lies between 0 and 1 as confidence_interval() needs
+            share = sum(v * count for v, count in zip(value, counts)) / (done * value[-1])
+            scale = value[-1] / intervals
+            estimate = exact / intervals + scale * share
+            if width is None:
+                return estimate
+            low, high = confidence_interval(share, done, confidence)
+            if scale * (high - low) <= width or done >= max_iterations:
+                return estimate, (exact / intervals + scale * low, exact / intervals + scale * high), done
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def by_level(distance):
+    """Groups the nodes of many trees by their distance from the root
+
+    Args:
+        distance (2D Integer Array): distance of every node from the root, one tree per row
+
+    Returns:
+        List: tree and node index Arrays of every level, nearest to the root first, without the roots
+    """
+    trees, nodes = np.nonzero(distance > 0)
+    levels = distance[trees, nodes]
+    order = np.argsort(levels, kind="stable")
+    trees, nodes, levels = trees[order], nodes[order], levels[order]
+    bounds = np.flatnonzero(np.diff(levels)) + 1
+    return list(zip(np.split(trees, bounds), np.split(nodes, bounds)))
+
+
+def tree_flows(distance, next_edge, next_node, demand, edge_count):
+    """Sums the flow carried by every edge of many shortest-path trees at once
+
+    Args:
+        distance (2D Integer Array): distance of every node from the root, one tree per row
+        next_edge (2D Integer Array): next hop edge id of every node
+        next_node (2D Integer Array): next node index of every node
+        demand (2D Array): Bits per sec sent from every node towards the root
+        edge_count (Integer): number of edges
+
+    Returns:
+        Tuple: Float Array of the flow of every edge, summed over the trees, and 2D Float
+        Array of the traffic every node hands to its next hop
+    """
+    carried = demand.astype(float)
+    flows = np.zeros(edge_count)
+    # the farthest nodes hand their traffic to the next hop first
+    for trees, nodes in reversed(by_level(distance)):
+        volume = carried[trees, nodes]
+        flows += np.bincount(next_edge[trees, nodes], weights=volume, minlength=edge_count)
+        np.add.at(carried, (trees, next_node[trees, nodes]), volume)
+    return flows, carried
+
+
+def push(next_edge, next_node, trees, nodes, volume, states, flows):
+    """Adds the volume sent from some nodes to the flow of every edge on their route
+
+    Args:
+        next_edge (2D Integer Array): next hop edge id of every node, one tree per row
+        next_node (2D Integer Array): next node index of every node
+        trees (Integer Array): tree of every sending node
+        nodes (Integer Array): index of every sending node
+        volume (Float Array): Bits per sec sent by every node
+        states (Integer Array): row of flows every sending node adds to
+        flows (2D Float Array): flow of every edge, one row per state, updated in place
+    """
+    while trees.size:
+        edges = next_edge[trees, nodes]
+        going = edges >= 0
+        trees, nodes, volume, states, edges = trees[going], nodes[going], volume[going], states[going], edges[going]
+        np.add.at(flows, (states, edges), volume)
+        nodes = next_node[trees, nodes]
+
+
+class DestinationTrees(object):
+    """Shortest-path trees of an intact Network towards every destination of its traffic.
+
+    A failure state is evaluated by repairing only the part of a tree that hangs
+    below a failed edge. Nodes above it keep their routes, which are still the
+    shortest ones of lowest index, so a repaired tree is the same tree that
+    shortest_path_trees() would grow from scratch.
+    """
+
+    def __init__(self, node_count, heads, tails, demand):
+        """Initialize the trees of the intact Network.
+
+        Args:
+            node_count (Integer): number of nodes
+            heads (Integer Array): node index of one end of every edge
+            tails (Integer Array): node index of the other end of every edge
+            demand (Dict): Bits per sec from node i to node j, keyed by (i, j) node indexes
+        """
+        self.node_count = node_count
+        self.edge_count = len(heads)
+        demand = {pair: volume for pair, volume in demand.items() if volume}
+        sources = np.array([i for i, _ in demand], dtype=np.intp)
+        destinations = np.array([j for _, j in demand], dtype=np.intp)
+        self.roots = np.unique(destinations)
+        if not self.roots.size:
+            self.roots = np.zeros(1, dtype=np.intp)
+        self.demand = np.zeros((len(self.roots), node_count))
+        np.add.at(self.demand, (np.searchsorted(self.roots, destinations), sources), list(demand.values()))
+        self.neighbours, self.edges, self.first_edge, self.degree = adjacency(node_count, heads, tails)
+        self.distance, self.next_edge, self.next_node = shortest_path_trees(
+            node_count, heads, tails, np.ones(self.edge_count, dtype=bool), self.roots)
+        self.spanning = bool((self.distance >= 0).all())
+        self.connectivity = Connectivity(node_count, heads, tails)
+        self.flows, self.carried = tree_flows(self.distance, self.next_edge, self.next_node, self.demand,
+                                              self.edge_count)
+        # every subtree is a slice of the preorder of its tree
+        levels = by_level(self.distance)
+        self.size = np.ones(self.distance.shape, dtype=np.intp)
+        for trees, nodes in reversed(levels):
+            np.add.at(self.size, (trees, self.next_node[trees, nodes]), self.size[trees, nodes])
+        self.start = np.zeros(self.distance.shape, dtype=np.intp)
+        for trees, nodes in levels:
+            parents = self.next_node[trees, nodes]
+            order = np.lexsort((nodes, parents, trees))
+            trees, nodes, parents = trees[order], nodes[order], parents[order]
+            sizes = np.cumsum(self.size[trees, nodes])
+            families = np.r_[True, (trees[1:] != trees[:-1]) | (parents[1:] != parents[:-1])]
+            before = np.maximum.accumulate(np.where(families, sizes - self.size[trees, nodes], 0))
+            self.start[trees, nodes] = self.start[trees, parents] + 1 + sizes - self.size[trees, nodes] - before
+        self.preorder = np.zeros(self.distance.shape, dtype=np.intp)
+        self.preorder[np.arange(len(self.roots))[:, None], self.start] = np.arange(node_count)
+        # count of the nodes sending traffic before every position of the preorder
+        sending = np.cumsum(self.demand[np.arange(len(self.roots))[:, None], self.preorder] != 0, axis=1)
+        self.sending = np.concatenate((np.zeros((len(self.roots), 1), dtype=np.intp), sending), axis=1)
+        # the trees every edge belongs to, with the node that hangs below it
+        trees, children = np.nonzero(self.next_edge >= 0)
+        edges = self.next_edge[trees, children]
+        order = np.argsort(edges, kind="stable")
+        self.edge_trees, self.edge_children = trees[order], children[order]
+        self.edge_first = np.searchsorted(edges[order], np.arange(self.edge_count + 1))
+
+    def reroute(self, alive, flows):
+        """Moves the flow of every failure state onto its repaired trees.
+
+        Args:
+            alive (2D Bool Array): edges present in every state, one row each
+            flows (2D Float Array): flow of every edge in every state, starting from
+                the flow of the intact Network, updated in place
+
+        Returns:
+            Bool Array: True for every state that still connects all the nodes
+        """
+        if not self.spanning:
+            return np.zeros(len(alive), dtype=bool)
+        connected = self.connectivity.connected(alive)
+        # states are taken in groups that cut a bounded count of subtrees
+        ends = np.cumsum(~alive @ np.diff(self.edge_first))
+        first = 0
+        while first < len(alive):
+            before = ends[first - 1] if first else 0
+            last = max(first + 1, int(np.searchsorted(ends, before + 2 ** 20, side="right")))
+            self.cut(alive[first:last], flows[first:last])
+            first = last
+        return connected
+
+    def cut(self, alive, flows):
+        """Repairs the trees some failure states cut where traffic has to move.
+
+        Args:
+            alive (2D Bool Array): edges present in every state, one row each
+            flows (2D Float Array): flow of every edge in every state, updated in place
+        """
+        states, dead = np.nonzero(~alive)
+        counts = self.edge_first[dead + 1] - self.edge_first[dead]
+        position = ragged_range(self.edge_first[dead], counts)
+        states, cut_trees, cut_children = np.repeat(states, counts), self.edge_trees[position], self.edge_children[position]
+        keys = states * len(self.roots) + cut_trees
+        # a tree needs repairing only if a node sending traffic was cut off
+        start = self.start[cut_trees, cut_children]
+        sending = self.sending[cut_trees, start + self.size[cut_trees, cut_children]] > self.sending[cut_trees, start]
+        needed = np.isin(keys, keys[sending])
+        states, cut_trees, cut_children, keys = states[needed], cut_trees[needed], cut_children[needed], keys[needed]
+        # one row for every state and tree that lost an edge
+        keys, rows = np.unique(keys, return_inverse=True)
+        row_states, row_trees = np.divmod(keys, len(self.roots))
+        order = np.argsort(rows, kind="stable")
+        rows, cut_children = rows.reshape(-1)[order], cut_children[order]
+        chunk = max(1, 2 ** 20 // self.node_count)
+        for first in range(0, len(keys), chunk):
+            bounds = np.searchsorted(rows, [first, first + chunk])
+            self.repair(alive, flows, row_states[first:first + chunk], row_trees[first:first + chunk],
+                        rows[bounds[0]:bounds[1]] - first, cut_children[bounds[0]:bounds[1]])
+
+    def repair(self, alive, flows, states, trees, rows, children):
+        """Repairs some trees of some failure states and moves their flow.
+
+        A tree is only grown again until every node sending traffic that was cut
+        off has a route, the nodes left have no traffic to move. The traffic is
+        then summed up the new branches, so only the top of every cut subtree and
+        every node the new branches join the rest of the tree at follow their
+        route to the root, not every node that sends traffic.
+
+        Args:
+            alive (2D Bool Array): edges present in every state, one row each
+            flows (2D Float Array): flow of every edge in every state, updated in place
+            states (Integer Array): state of every repaired tree
+            trees (Integer Array): tree index of every repaired tree
+            rows (Integer Array): repaired tree that lost each failed edge
+            children (Integer Array): node hanging below each failed edge
+        """
+        n = self.node_count
+        # nodes below the failed edges are slices of the preorder, slices inside other slices are dropped
+        first = rows * n + self.start[trees[rows], children]
+        last = first + self.size[trees[rows], children]
+        order = np.argsort(first, kind="stable")
+        first, last = first[order], last[order]
+        outer = first >= np.r_[0, np.maximum.accumulate(last)[:-1]]
+        tops = np.divmod(first[outer], n)
+        cut_rows, position = np.divmod(ragged_range(first[outer], last[outer] - first[outer]), n)
+        cut_nodes = self.preorder[trees[cut_rows], position]
+        alive = alive[states]
+        # one flat index finds a node of a repaired tree, the trees laid out one after another
+        cells = cut_rows * n + cut_nodes
+        flat_distance = self.distance[trees].reshape(-1)
+        flat_distance[cells] = -1
+        inside = np.zeros(flat_distance.shape, dtype=bool)
+        inside[cells] = True
+        # hops into the part of the tree that was not cut, by the distance they give
+        hops = self.hops(alive, flat_distance, cut_rows, cut_nodes)
+        levels = flat_distance[hops[0] * n + hops[2]] + 1
+        order = np.argsort(levels, kind="stable")
+        bounds = np.flatnonzero(np.diff(levels[order])) + 1
+        # with no hop at all every cut node is lost
+        buckets = {int(part[0]): [tuple(hop[part_order] for hop in hops)]
+                   for part, part_order in zip(np.split(levels[order], bounds), np.split(order, bounds)) if part.size}
+        # then through the cut part, nearest nodes first, each taking its lowest index next node
+        senders = self.demand.reshape(-1)[trees[cut_rows] * n + cut_nodes] != 0
+        waiting = np.bincount(cut_rows[senders], minlength=len(trees))
+        best = np.full(flat_distance.shape, n, dtype=np.intp)
+        found_levels = []
+        while buckets:
+            level = min(buckets)
+            rows_, nodes, parents, edges = (np.concatenate(part) for part in zip(*buckets.pop(level)))
+            found = rows_ * n + nodes
+            open_ = (flat_distance[found] < 0) & (waiting[rows_] > 0)
+            rows_, nodes, parents, edges, found = rows_[open_], nodes[open_], parents[open_], edges[open_], found[open_]
+            np.minimum.at(best, found, parents)
+            lowest = parents == best[found]
+            rows_, nodes, parents, edges, found = rows_[lowest], nodes[lowest], parents[lowest], edges[lowest], found[lowest]
+            flat_distance[found] = level
+            found_levels.append((rows_, nodes, parents, edges))
+            waiting -= np.bincount(rows_[self.demand.reshape(-1)[trees[rows_] * n + nodes] != 0], minlength=len(trees))
+            going = waiting[rows_] > 0
+            hops = self.hops(alive, flat_distance, rows_[going], nodes[going], outward=True)
+            if hops[0].size:
+                buckets.setdefault(level + 1, []).append(hops)
+        # the traffic of the cut subtrees leaves their old branches, then the route above their tops
+        volume = self.carried[trees[cut_rows], cut_nodes]
+        moved = volume != 0
+        np.add.at(flows, (states[cut_rows[moved]], self.next_edge[trees[cut_rows[moved]], cut_nodes[moved]]),
+                  -volume[moved])
+        top_rows, top_nodes = tops[0], self.preorder[trees[tops[0]], tops[1]]
+        volume = self.carried[trees[top_rows], top_nodes]
+        moved = volume != 0
+        top_rows, top_nodes, volume = top_rows[moved], top_nodes[moved], volume[moved]
+        push(self.next_edge, self.next_node, trees[top_rows], self.next_node[trees[top_rows], top_nodes], -volume,
+             states[top_rows], flows)
+        # and takes the new branches, farthest nodes first, then the route of the nodes they join
+        carried = np.zeros(flat_distance.shape)
+        carried[cells[senders]] = self.demand[trees[cut_rows[senders]], cut_nodes[senders]]
+        joins = []
+        for rows_, nodes, parents, edges in reversed(found_levels):
+            volume = carried[rows_ * n + nodes]
+            moved = volume != 0
+            rows_, parents, edges, volume = rows_[moved], parents[moved], edges[moved], volume[moved]
+            np.add.at(flows, (states[rows_], edges), volume)
+            below = inside[rows_ * n + parents]
+            np.add.at(carried, rows_[below] * n + parents[below], volume[below])
+            joins.append((rows_[~below] * n + parents[~below], volume[~below]))
+        if joins:
+            keys, index = np.unique(np.concatenate([key for key, _ in joins]), return_inverse=True)
+            volume = np.bincount(index.reshape(-1), weights=np.concatenate([volume for _, volume in joins]))
+            join_rows, join_nodes = np.divmod(keys, n)
+            push(self.next_edge, self.next_node, trees[join_rows], join_nodes, volume, states[join_rows], flows)
+
+    def hops(self, alive, distance, rows, nodes, outward=False):
+        """Lists the working edges between some nodes of repaired trees and their neighbours.
+
+        Args:
+            alive (2D Bool Array): edges present in every repaired tree, one row each
+            distance (Integer Array): distance of every node of every repaired tree, one tree
+                after another, -1 if not known yet
+            rows (Integer Array): repaired tree of every node
+            nodes (Integer Array): node indexes
+            outward (bool, optional): list the hops from the neighbours with no distance yet
+                to the nodes, instead of the hops from the nodes to the neighbours with one.
+                Defaults to False.
+
+        Returns:
+            Tuple: tree, node, next node and next hop edge id Integer Arrays of every hop
+        """
+        counts = self.degree[nodes]
+        position = ragged_range(self.first_edge[nodes], counts)
+        rows, nodes = np.repeat(rows, counts), np.repeat(nodes, counts)
+        neighbours, edges = self.neighbours[position], self.edges[position]
+        usable = alive[rows, edges] & ((distance[rows * self.node_count + neighbours] < 0) == outward)
+        if outward:
+            return rows[usable], neighbours[usable], nodes[usable], edges[usable]
+        return rows[usable], nodes[usable], neighbours[usable], edges[usable]
+
+
+def T_batch(flows, capacities, alive, matrix_sum, m):
+    """Calculates avg. latency of a packet for many states of a Network at once
+
+    Args:
+        flows (2D Float Array): flow of every edge, one row per state
+        capacities (Float Array): capacity of every edge
+        alive (2D Bool Array): edges present in every state
+        matrix_sum (Integer): Sum of all the elements in intensity matrix
+        m (Integer): Avg. packet size in bits
+
+    Returns:
+        Float Array: avg. latency of a packet in every state, nan where T() gives None
+    """
+    slack = capacities / m - flows
+    overloaded = (alive & (slack <= 0)).any(axis=1)
+    delays = np.where(alive & (slack > 0), flows / np.where(slack > 0, slack, 1), 0)
+    t = delays.sum(axis=1) / matrix_sum
+    t[overloaded] = np.nan
+    return t
+
+
+def batch_reliability(graph, matrix, T_max, p, m, iterations=100, intervals=10, batch_size=4096, rng=None,
+                      cache_size=2 ** 16):
+    """Tests the reliability of the Network on whole batches of trials at once
+
+    Gives the same estimate as reliability(). A trial is drawn as the interval in
+    which every edge fails first and states of the Network that repeat between
+    trials are evaluated only once, while they are remembered.
+
+    Args:
+        graph (networkx Graph): Graph to be tested
+        matrix (2D Integer List): intensity matrix of Bits per sec for a route for node i to j
+        T_max (Integer): latency of a packet
+        p (Float):  probability of an edge not failing
+        m (Integer): Avg. packet size in bits
+        iterations (int, optional): count of iteration in a test. Defaults to 100.
+        intervals (int, optional): number of intervals. Defaults to 10.
+        batch_size (int, optional): number of trials drawn at once. Defaults to 4096.
+        rng (numpy Generator, optional): source of the failures. Defaults to a fresh one.
+        cache_size (int, optional): count of states remembered, all forgotten at once
+            when there are more. Defaults to 65536.
+
+    Returns:
+        Float: reliability of the Network
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    table = routing(graph)
+    if table.removed:
+        table = RoutingTable(graph)
+    node_count, edge_count = len(table.nodes), len(table.edges)
+    trees = DestinationTrees(node_count, table.heads, table.tails, intensity(table, matrix))
+    connectivity = Connectivity(node_count, table.heads, table.tails)
+    matrix_sum = total(matrix)
+    capacities = attributes(graph).values("capacity", table)
+    base_t = T(graph, matrix_sum, m)
+    base_ok = bool(base_t) and base_t < T_max
+    states = {}
+
+    def evaluate(alive):
+        if PROFILE is not None:
+            clock = time.perf_counter()
+        ok = connectivity.connected(alive)
+        if PROFILE is not None:
+            clock = record("connectivity", clock)
+        # the flows of a bounded count of states at a time
+        chunk = max(1, 2 ** 22 // max(1, edge_count))
+        connected = np.flatnonzero(ok)
+        for first in range(0, len(connected), chunk):
+            rows = connected[first:first + chunk]
+            flows = np.tile(trees.flows, (len(rows), 1))
+            trees.reroute(alive[rows], flows)
+            if PROFILE is not None:
+                clock = record("reroute", clock)
+            t = T_batch(flows, capacities, alive[rows], matrix_sum, m)
+            ok[rows] = (t > 0) & (t < T_max)
+            if PROFILE is not None:
+                clock = record("latency", clock)
+        return ok
+
+    successful_trials = 0
+    for start in range(0, iterations, batch_size):
+        size = min(batch_size, iterations - start)
+        if p < 1:
+            fails = rng.geometric(1 - p, size=(size, edge_count))
+        else:
+            fails = np.full((size, edge_count), intervals + 1)
+        running = np.ones(size, dtype=bool)
+        for k in range(1, intervals + 1):
+            broken = running & (fails == k).any(axis=1)
+            ok = np.zeros(size, dtype=bool)
+            ok[running & ~broken] = base_ok
+            if broken.any():
+                keys = np.packbits(fails[broken] > k, axis=1)
+                unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+                known = [states.get(key.tobytes()) for key in unique]
+                new = [u for u, state in enumerate(known) if state is None]
+                if new:
+                    alive = np.unpackbits(unique[new], axis=1, count=edge_count).astype(bool)
+                    results = evaluate(alive).tolist()
+                    for u, result in zip(new, results):
+                        known[u] = result
+                    if len(states) + len(new) > cache_size:
+                        states.clear()
+                    states.update(zip((unique[u].tobytes() for u in new), results))
+                ok[broken] = np.array(known, dtype=bool)[inverse.reshape(-1)]
+            running &= ok
+            successful_trials += int(running.sum())
     return successful_trials / (iterations * intervals)
 
 
+class Sweep(object):
+    """Trials of reliability() replayed at every step of an experiment.
+
+    The interval in which every edge fails is drawn once for every trial, so all
+    the steps see the same failures and their results differ only by what the
+    step changed. The distinct failure states of the trials, whether they stay
+    connected and their flows are kept while the topology stays the same. A
+    change of capacity then only checks the latency again and a change of
+    intensity only routes the difference of the matrices. States are checked
+    for connectivity and routed on first use, by a trial that is still running.
+    The states are shared by all the steps of an experiment, so a Sweep runs in
+    the process that holds it, and the workers of an experiment only run its
+    trials with common=False.
+    """
+
+    def __init__(self, graph, p, iterations=100, intervals=10, seed=None, edges=()):
+        """Initialize a Sweep drawing the failures of every trial.
+
+        Args:
+            graph (networkx Graph): Graph of the first step
+            p (Float): probability of an edge not failing
+            iterations (int, optional): count of trials. Defaults to 100.
+            intervals (int, optional): number of intervals. Defaults to 10.
+            seed (int, optional): seed of the failures. Defaults to a fresh one.
+            edges (List, optional): edges added to the Graph by later steps. Defaults to none.
+        """
+        self.iterations = iterations
+        self.intervals = intervals
+        self.columns = {}
+        for i, j in list(graph.edges) + list(edges):
+            if (i, j) not in self.columns:
+                self.columns[i, j] = self.columns[j, i] = len(self.columns) // 2
+        shape = (iterations, len(self.columns) // 2)
+        if p < 1:
+            self.fails = np.minimum(np.random.default_rng(seed).geometric(1 - p, size=shape), intervals + 1)
+        else:
+            self.fails = np.full(shape, intervals + 1)
+        self.table = None
+        self.sent = None
+
+    def topology(self, graph):
+        """Starts over the failure states for the edges of the Graph, found as trials are replayed."""
+        table = routing(graph)
+        if table.removed:
+            table = RoutingTable(graph)
+        self.table = table
+        self.sent = None
+        self.edge_columns = [self.columns[edge] for edge in table.edges]
+        # the state of every interval of every trial, -1 where no edge fails in it
+        self.sequence = np.full((self.iterations, self.intervals), -1, dtype=np.intp)
+        self.sequenced = 0
+        self.states = {}
+        self.alive = np.zeros((0, len(table.edges)), dtype=bool)
+        self.connectivity = Connectivity(len(table.nodes), table.heads, table.tails)
+        self.connected = np.zeros(0, dtype=bool)
+        self.known = np.zeros(0, dtype=bool)
+        self.flows = np.zeros((0, len(table.edges)))
+        self.routed = np.zeros(0, dtype=bool)
+
+    def sequence_trials(self, stop):
+        """Finds the failure states of the trials up to stop that were not replayed yet."""
+        start = self.sequenced
+        if stop <= start:
+            return
+        fails = self.fails[start:stop][:, self.edge_columns]
+        failing = np.zeros((len(fails), self.intervals + 2), dtype=bool)
+        failing[np.arange(len(fails))[:, None], fails] = True
+        trials, intervals = np.nonzero(failing[:, 1:self.intervals + 1])
+        keys = np.packbits(fails[trials] > intervals[:, None] + 1, axis=1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        known = len(self.states)
+        ids = np.array([self.states.setdefault(key.tobytes(), len(self.states)) for key in unique], dtype=np.intp)
+        self.sequence[start + trials, intervals] = ids[inverse.reshape(-1)]
+        added = len(self.states) - known
+        if added:
+            # new ids were given in the order of the unique keys
+            alive = np.unpackbits(unique[ids >= known], axis=1, count=len(self.table.edges)).astype(bool)
+            self.alive = np.concatenate((self.alive, alive))
+            self.connected = np.concatenate((self.connected, np.zeros(added, dtype=bool)))
+            self.known = np.concatenate((self.known, np.zeros(added, dtype=bool)))
+            self.flows = np.concatenate((self.flows, np.zeros((added, len(self.table.edges)))))
+            self.routed = np.concatenate((self.routed, np.zeros(added, dtype=bool)))
+        self.sequenced = stop
+
+    def stays_connected(self, states):
+        """Tells which failure states stay connected, checking the ones not checked yet.
+
+        Args:
+            states (Integer Array): failure states
+
+        Returns:
+            Bool Array: whether every state stays connected
+        """
+        unknown = states[~self.known[states]]
+        if unknown.size:
+            if PROFILE is not None:
+                clock = time.perf_counter()
+            self.connected[unknown] = self.connectivity.connected(self.alive[unknown])
+            self.known[unknown] = True
+            if PROFILE is not None:
+                record("connectivity", clock)
+        return self.connected[states]
+
+    def route(self, matrix, states):
+        """Sets the flow of some connected failure states for the intensity matrix.
+
+        States routed at an earlier step only route the difference of the matrices.
+
+        Args:
+            matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+            states (Integer Array): failure states that need their flow
+        """
+        sent = intensity(self.table, matrix)
+        if self.sent is not None and sent != self.sent:
+            change = {pair: sent.get(pair, 0) - self.sent.get(pair, 0) for pair in sent.keys() | self.sent.keys()}
+            self.add_flow({pair: volume for pair, volume in change.items() if volume}, np.flatnonzero(self.routed))
+        self.sent = sent
+        states = states[~self.routed[states]]
+        self.add_flow(sent, states)
+        self.routed[states] = True
+
+    def add_flow(self, demand, states):
+        """Adds the flow of some demands to some failure states.
+
+        Args:
+            demand (Dict): Bits per sec keyed by (i, j) node indexes
+            states (Integer Array): connected failure states
+        """
+        if not demand or not states.size:
+            return
+        table = self.table
+        trees = DestinationTrees(len(table.nodes), table.heads, table.tails, demand)
+        flows = np.tile(trees.flows, (len(states), 1))
+        trees.reroute(self.alive[states], flows)
+        self.flows[states] += flows
+
+    def reliability(self, graph, matrix, T_max, m, width=None, confidence=0.95, block=100):
+        """Tests the reliability of the Network of the current step
+
+        Given a width, the trials are replayed in blocks until the confidence
+        interval of the estimate is no wider or every trial of the Sweep was run.
+        Steps replay the same trials from the first one, so they stay common.
+
+        Args:
+            graph (networkx Graph): Graph to be tested
+            matrix (2D Integer List or Dict): intensity matrix of Bits per sec for a route for node i to j
+            T_max (Integer): latency of a packet
+            m (Integer): Avg. packet size in bits
+            width (float, optional): widest confidence interval to stop at. Defaults to running every trial.
+            confidence (float, optional): confidence of the interval. Defaults to 0.95.
+            block (int, optional): count of trials run between checks of the interval. Defaults to 100.
+
+        Returns:
+            Float: reliability of the Network, or with a width a Tuple of it, its confidence
+            interval and the count of trials run
+        """
+        if self.table is None or not self.table.matches(graph):
+            if PROFILE is not None:
+                clock = time.perf_counter()
+            self.topology(graph)
+            if PROFILE is not None:
+                record("setup", clock)
+        matrix_sum = total(matrix)
+        capacities = attributes(graph).values("capacity", self.table)
+        base_t = T(graph, matrix_sum, m)
+        base_ok = bool(base_t) and base_t < T_max
+        ok = np.zeros(len(self.alive), dtype=bool)
+        checked = np.zeros(len(self.alive), dtype=bool)
+        successful_trials = 0
+        for start in range(0, self.iterations, self.iterations if width is None else block):
+            stop = min(self.iterations, start + (self.iterations if width is None else block))
+            self.sequence_trials(stop)
+            ok = np.concatenate((ok, np.zeros(len(self.alive) - len(ok), dtype=bool)))
+            checked = np.concatenate((checked, np.zeros(len(self.alive) - len(checked), dtype=bool)))
+            sequence = self.sequence[start:stop]
+            running = np.ones(len(sequence), dtype=bool)
+            for k in range(self.intervals):
+                # only the states of the trials still running are checked
+                states = sequence[running, k]
+                new = np.unique(states[states >= 0])
+                new = new[~checked[new]]
+                checked[new] = True
+                new = new[self.stays_connected(new)]
+                if new.size:
+                    if PROFILE is not None:
+                        clock = time.perf_counter()
+                    self.route(matrix, new)
+                    if PROFILE is not None:
+                        clock = record("reroute", clock)
+                    t = T_batch(self.flows[new], capacities, self.alive[new], matrix_sum, m)
+                    ok[new] = (t > 0) & (t < T_max)
+                    if PROFILE is not None:
+                        record("latency", clock)
+                running[running] = np.where(states >= 0, ok[states], base_ok)
+                successful_trials += int(running.sum())
+            done = start + len(sequence)
+            estimate = successful_trials / (done * self.intervals)
+            if width is not None:
+                low, high = confidence_interval(estimate, done, confidence)
+                if high - low <= width:
+                    break
+        if width is None:
+            return estimate
+        return estimate, (low, high), done
+
+
 def append_flow(graph, i, j, change):
     """Adds the change to a route between i and j node 
 
@@ -108,12 +1636,12 @@ def append_flow(graph, i, j, change):
         j (Integer): ID of a Node in Graph to
         change (Integer): amount do add to a path
     """
-    path = nx.shortest_path(graph, i, j)
-    for n in range(len(path) - 1):
-        graph[path[n]][path[n + 1]]["flow"] += change
+    store = attributes(graph)
+    store.flow[store.table.path(i, j)] += change
 
 
-def experiment1(graph, matrix, T_max, p, m, iterations=10, step=10):
+def experiment1(graph, matrix, T_max, p, m, iterations=10, step=10, seed=None, workers=None, common=True,
+                width=None, confidence=0.95, max_iterations=10000, report=None):
     """Tests the reliability of a network while incrementing the intencity 
 
     Args:
@@ -124,25 +1652,50 @@ def experiment1(graph, matrix, T_max, p, m, iterations=10, step=10):
         m (Integer): Avg. packet size in bits
         iterations (int, optional): number of itetetatons of the experiment. Defaults to 10.
         step (int, optional): increment of intencity. Defaults to 10.
+        seed (int, optional): master seed of the experiment. Defaults to a fresh one.
+        workers (int, optional): number of processes running the trials that are not common. Defaults to one.
+        common (bool, optional): replay the same failures at every step. Defaults to True.
+        width (float, optional): widest confidence interval of every result, a result then also
+            holds the interval and the count of trials. Defaults to a fixed count of trials.
+        confidence (float, optional): confidence of the interval. Defaults to 0.95.
+        max_iterations (int, optional): most trials of a result for a width. Defaults to 10000.
+        report (Callable, optional): called with the step and the result of every step as soon as it is known. Defaults to None.
 
     Returns:
         List: list of results od the experiment
     """
-    test_graph = deepcopy(graph)
-    test_matrix = deepcopy(matrix)
-    results = [reliability(test_graph, test_matrix, T_max, p, m)]
-    for _ in range(iterations):
-        while True:
-            i, j = random.randint(0, 19), random.randint(0, 19)
-            if i != j:
-                break
-        test_matrix[i][j] += step
+    seeds = np.random.SeedSequence(seed).spawn(iterations + 2)
+    rand = random.Random(int(seeds[-1].generate_state(1, np.uint64)[0]))
+    test_graph = graph.copy()
+    test_matrix = sparse(matrix)
+    nodes = list(test_graph.nodes)
+    sweep = Sweep(test_graph, p, iterations=max_iterations if width else 100, seed=seeds[0]) if common else None
+
+    def test(k):
+        if common:
+            result = sweep.reliability(test_graph, test_matrix, T_max, m, width=width, confidence=confidence)
+        else:
+            result = reliability(test_graph, test_matrix, T_max, p, m, seed=seeds[k], workers=workers,
+                                 width=width, confidence=confidence, max_iterations=max_iterations)
+        if report is not None:
+            report(k, result)
+        return result
+
+    results = [test(0)]
+    for k in range(iterations):
+        if PROFILE is not None:
+            clock = time.perf_counter()
+        i, j = rand.sample(nodes, 2)
+        test_matrix[i, j] = test_matrix.get((i, j), 0) + step
         append_flow(test_graph, i, j, step)
-        results.append(reliability(test_graph, test_matrix, T_max, p, m))
+        if PROFILE is not None:
+            record("step", clock)
+        results.append(test(k + 1))
     return results
 
 
-def experiment2(graph, matrix, T_max, p, m, iterations=10):
+def experiment2(graph, matrix, T_max, p, m, iterations=10, seed=None, workers=None, common=True,
+                width=None, confidence=0.95, max_iterations=10000, report=None):
     """Tests the reliability of a network while incementing the capacity
 
     Args:
@@ -152,20 +1705,45 @@ def experiment2(graph, matrix, T_max, p, m, iterations=10):
         p (Float): probability of an edge not failing
         m (Integer): Avg. packet size in bits
         iterations (int, optional): number of itetetatons of the experiment. Defaults to 10.
+        seed (int, optional): master seed of the experiment. Defaults to a fresh one.
+        workers (int, optional): number of processes running the trials that are not common. Defaults to one.
+        common (bool, optional): replay the same failures at every step. Defaults to True.
+        width (float, optional): widest confidence interval of every result, a result then also
+            holds the interval and the count of trials. Defaults to a fixed count of trials.
+        confidence (float, optional): confidence of the interval. Defaults to 0.95.
+        max_iterations (int, optional): most trials of a result for a width. Defaults to 10000.
+        report (Callable, optional): called with the step and the result of every step as soon as it is known. Defaults to None.
 
     Returns:
         List: list of results od the experiment
     """
-    test_graph = deepcopy(graph)
-    results = [reliability(test_graph, matrix, T_max, p, m)]
-    for _ in range(iterations):
-        for i, j in test_graph.edges:
-            test_graph[i][j]["capacity"] += PING_STANDARD_SIZE
-        results.append(reliability(test_graph, matrix, T_max, p, m))
+    seeds = np.random.SeedSequence(seed).spawn(iterations + 2)
+    test_graph = graph.copy()
+    sweep = Sweep(test_graph, p, iterations=max_iterations if width else 100, seed=seeds[0]) if common else None
+
+    def test(k):
+        if common:
+            result = sweep.reliability(test_graph, matrix, T_max, m, width=width, confidence=confidence)
+        else:
+            result = reliability(test_graph, matrix, T_max, p, m, seed=seeds[k], workers=workers,
+                                 width=width, confidence=confidence, max_iterations=max_iterations)
+        if report is not None:
+            report(k, result)
+        return result
+
+    results = [test(0)]
+    for k in range(iterations):
+        if PROFILE is not None:
+            clock = time.perf_counter()
+        attributes(test_graph).capacity += PING_STANDARD_SIZE
+        if PROFILE is not None:
+            record("step", clock)
+        results.append(test(k + 1))
     return results
 
 
-def experiment3(graph, matrix, T_max, p, m, iterations=10):
+def experiment3(graph, matrix, T_max, p, m, iterations=10, seed=None, workers=None, common=True,
+                width=None, confidence=0.95, max_iterations=10000, report=None):
     """Tests the reliability of a network while adding edges with capacities equal as avg. from the previous network
 
     Args:
@@ -175,42 +1753,227 @@ def experiment3(graph, matrix, T_max, p, m, iterations=10):
         p (Float): probability of an edge not failing
         m (Integer): Avg. packet size in bits
         iterations (int, optional): number of itetetatons of the experiment. Defaults to 10.
+        seed (int, optional): master seed of the experiment. Defaults to a fresh one.
+        workers (int, optional): number of processes running the trials that are not common. Defaults to one.
+        common (bool, optional): replay the same failures at every step. Defaults to True.
+        width (float, optional): widest confidence interval of every result, a result then also
+            holds the interval and the count of trials. Defaults to a fixed count of trials.
+        confidence (float, optional): confidence of the interval. Defaults to 0.95.
+        max_iterations (int, optional): most trials of a result for a width. Defaults to 10000.
+        report (Callable, optional): called with the step and the result of every step as soon as it is known. Defaults to None.
 
     Returns:
         List: list of results od the experiment
     """
-    test_graph = deepcopy(graph)
-    results = [reliability(test_graph, matrix, T_max, p, m)]
-    caps = nx.get_edge_attributes(test_graph, "capacity").values()
-    new_cap = sum(caps) / len(caps)
-    non_nodes = list(nx.non_edges(test_graph))
-    for _ in range(iterations):
-        i, j = random.sample(non_nodes, 1)[0]
-        non_nodes.remove((i, j))
+    seeds = np.random.SeedSequence(seed).spawn(iterations + 2)
+    rand = random.Random(int(seeds[-1].generate_state(1, np.uint64)[0]))
+    test_graph = graph.copy()
+    store = attributes(test_graph)
+    new_cap = store.capacity[store.alive()].mean().item()
+    nodes = list(test_graph.nodes)
+    if iterations > len(nodes) * (len(nodes) - 1) // 2 - test_graph.number_of_edges():
+        raise ValueError("Cannot add more edges than there are pairs of nodes without one.")
+    added = []
+    while len(added) < iterations:
+        i, j = rand.sample(nodes, 2)
+        if not test_graph.has_edge(i, j) and (i, j) not in added and (j, i) not in added:
+            added.append((i, j))
+    sweep = Sweep(test_graph, p, iterations=max_iterations if width else 100, seed=seeds[0], edges=added) if common else None
+
+    def test(k):
+        if common:
+            result = sweep.reliability(test_graph, matrix, T_max, m, width=width, confidence=confidence)
+        else:
+            result = reliability(test_graph, matrix, T_max, p, m, seed=seeds[k], workers=workers,
+                                 width=width, confidence=confidence, max_iterations=max_iterations)
+        if report is not None:
+            report(k, result)
+        return result
+
+    results = [test(0)]
+    for k, (i, j) in enumerate(added):
+        if PROFILE is not None:
+            clock = time.perf_counter()
         test_graph.add_edge(i, j)
-        test_graph[i][j]["capacity"] = new_cap
+        store = attributes(test_graph)
+        store.capacity[store.index(i, j)] = new_cap
         flow(test_graph, matrix)
-        results.append(reliability(test_graph, matrix, T_max, p, m))
+        if PROFILE is not None:
+            record("step", clock)
+        results.append(test(k + 1))
     return results
 
-def gen_intensity_matrix():
+def gen_intensity_matrix(node_count=20, seed=None):
     """Generates a random intensity matrix
 
+    Args:
+        node_count (int, optional): number of nodes. Defaults to 20.
+        seed (int, optional): seed of the matrix. Defaults to the global random state.
+
     Returns:
         2D Integer List: random intensity matrix
     """
+    rand = random if seed is None else random.Random(seed)
     N = []
-    for i in range(20):
+    for i in range(node_count):
         N.append([])
-        for j in range(20):
+        for j in range(node_count):
             if i == j:
                 N[i].append(0)
             else:
-                N[i].append(random.randint(0, 8))
+                N[i].append(rand.randint(0, 8))
     return N
 
-def t1(G, N):
-    suma = sum(sum(r) for r in N)
+
+def gen_sparse_intensity_matrix(nodes, count, high=8, seed=None):
+    """Generates a random intensity matrix in sparse form with only some of the node pairs sending
+
+    Args:
+        nodes (List): IDs of the Nodes of a Graph
+        count (Integer): number of demands
+        high (int, optional): highest intensity of a demand. Defaults to 8.
+        seed (int, optional): seed of the matrix. Defaults to a fresh one.
+
+    Returns:
+        Dict: random Bits per sec keyed by (i, j) node pairs
+    """
+    rand = random.Random(seed)
+    nodes = list(nodes)
+    count = min(count, len(nodes) * (len(nodes) - 1))
+    N = {}
+    while len(N) < count:
+        i, j = rand.sample(nodes, 2)
+        N[i, j] = rand.randint(1, high)
+    return N
+
+
+def mesh_topology(rows, cols):
+    """Generates a grid of rows x cols nodes, each linked to its neighbours
+
+    Args:
+        rows (Integer): number of rows
+        cols (Integer): number of columns
+
+    Returns:
+        networkx Graph: Graph with node IDs 0 to rows*cols - 1, row by row
+    """
+    G = nx.Graph()
+    G.add_nodes_from(range(rows * cols))
+    for i in range(rows):
+        for j in range(cols):
+            if j + 1 < cols:
+                G.add_edge(i*cols + j, i*cols + j + 1)
+            if i + 1 < rows:
+                G.add_edge(i*cols + j, (i + 1)*cols + j)
+    return G
+
+
+def ring_topology(node_count, chords=0, seed=None):
+    """Generates a ring of nodes, optionally with random chords across it
+
+    Args:
+        node_count (Integer): number of nodes
+        chords (int, optional): number of extra random links. Defaults to 0.
+        seed (int, optional): seed of the chords. Defaults to a fresh one.
+
+    Returns:
+        networkx Graph: Graph with node IDs 0 to node_count - 1 along the ring
+    """
+    G = nx.cycle_graph(node_count)
+    rand = random.Random(seed)
+    chords = min(chords, node_count * (node_count - 1) // 2 - G.number_of_edges())
+    while chords > 0:
+        i, j = rand.sample(range(node_count), 2)
+        if not G.has_edge(i, j):
+            G.add_edge(i, j)
+            chords -= 1
+    return G
+
+
+def geometric_topology(node_count, radius, seed=None):
+    """Generates nodes scattered in a unit square, linked when closer than the radius
+
+    Components left apart are linked by their closest pair of nodes, so the
+    network is always connected. Starting from the component of node 0, the
+    component closest to the ones linked so far is linked next, which takes a
+    single pass over the distances between the nodes.
+
+    Args:
+        node_count (Integer): number of nodes
+        radius (Float): longest link
+        seed (int, optional): seed of the positions. Defaults to a fresh one.
+
+    Returns:
+        networkx Graph: Graph with node IDs 0 to node_count - 1 and their "pos"
+    """
+    G = nx.random_geometric_graph(node_count, radius, seed=seed)
+    components = list(nx.connected_components(G))
+    if len(components) < 2:
+        return G
+    points = np.array([G.nodes[k]["pos"] for k in range(node_count)])
+    component = np.zeros(node_count, dtype=np.intp)
+    for c, nodes in enumerate(components):
+        component[list(nodes)] = c
+    # distance of every node to the closest linked node, and that node
+    nearest = np.full(node_count, np.inf)
+    partner = np.zeros(node_count, dtype=np.intp)
+    linked = np.zeros(node_count, dtype=bool)
+    added = np.flatnonzero(component == component[0])
+    chunk = max(1, 2 ** 20 // node_count)
+    while True:
+        linked[added] = True
+        for first in range(0, len(added), chunk):
+            part = added[first:first + chunk]
+            distance = np.linalg.norm(points[part][:, None, :] - points[None, :, :], axis=2)
+            closest = distance.argmin(axis=0)
+            distance = distance[closest, np.arange(node_count)]
+            better = distance < nearest
+            nearest[better] = distance[better]
+            partner[better] = part[closest[better]]
+        nearest[linked] = np.inf
+        if linked.all():
+            return G
+        b = int(np.argmin(nearest))
+        G.add_edge(int(partner[b]), b)
+        added = np.flatnonzero(component == component[b])
+
+
+def fat_tree_topology(k):
+    """Generates a k-ary fat-tree: (k/2)^2 core switches and k pods of k/2 aggregation and k/2 edge switches, each edge switch serving k/2 hosts
+
+    Args:
+        k (Integer): even number of ports of every switch
+
+    Returns:
+        networkx Graph: Graph with node IDs numbering the core switches, then every pod, then the hosts
+    """
+    if k % 2:
+        raise ValueError("k of a fat-tree has to be even.")
+    half = k // 2
+    G = nx.Graph()
+    core = list(range(half * half))
+    G.add_nodes_from(core)
+    hosts = len(core) + k * k
+    for pod in range(k):
+        aggregation = [len(core) + pod*k + a for a in range(half)]
+        edge = [len(core) + pod*k + half + e for e in range(half)]
+        for a, switch in enumerate(aggregation):
+            for c in range(half):
+                G.add_edge(switch, core[a*half + c])
+            for other in edge:
+                G.add_edge(switch, other)
+        for switch in edge:
+            for _ in range(half):
+                G.add_edge(switch, hosts)
+                hosts += 1
+    return G
+
+
+def t1(G, N, seed=None):
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+    suma = total(N)
     M = [2]
     P = [0.95]
     TMAX = [T(G, suma, 4)]
@@ -218,7 +1981,7 @@ def t1(G, N):
         for m in M:
             res = []
             for Tmax in TMAX:
-                for i in list(enumerate(experiment1(G, N, Tmax, p, m, step=(PING_STANDARD_SIZE*25), iterations=100))):
+                for i in list(enumerate(experiment1(G, N, Tmax, p, m, step=(PING_STANDARD_SIZE*25), iterations=100, seed=seed))):
                     res.append([Tmax, i[0], i[1]])
             df = pd.DataFrame(res, columns=['Tmax', 'iter', 'res'])
             sns.lineplot(data=df, x="iter", y="res")
@@ -227,8 +1990,11 @@ def t1(G, N):
     
 
 
-def t2(G, N):
-    suma = sum(sum(r) for r in N)
+def t2(G, N, seed=None):
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+    suma = total(N)
     M = [2]
     P = [0.95]
     TMAX = [T(G, suma, 4)]
@@ -236,15 +2002,18 @@ def t2(G, N):
         for m in M:
             res = []
             for Tmax in TMAX:
-                for i in list(enumerate(experiment2(G, N, Tmax, p, m, iterations=100))):
+                for i in list(enumerate(experiment2(G, N, Tmax, p, m, iterations=100, seed=seed))):
                     res.append([Tmax, i[0], i[1]])
             df = pd.DataFrame(res, columns=['Tmax', 'iter', 'res'])
             sns.lineplot(data=df, x="iter", y="res")
             plt.savefig(f"TEST2_{p}_{m}.png")
             plt.clf()
 
-def t3(G, N):
-    suma = sum(sum(r) for r in N)
+def t3(G, N, seed=None):
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+    suma = total(N)
     M = [2]
     P = [0.95]
     TMAX = [T(G, suma, 4)]
@@ -252,7 +2021,7 @@ def t3(G, N):
         for m in M:
             res = []
             for Tmax in TMAX:
-                for i in list(enumerate(experiment3(G, N, Tmax, p, m, iterations=100))):
+                for i in list(enumerate(experiment3(G, N, Tmax, p, m, iterations=100, seed=seed))):
                     res.append([Tmax, i[0], i[1]])
             df = pd.DataFrame(res, columns=['Tmax', 'iter', 'res'])
             sns.lineplot(data=df, x="iter", y="res")
@@ -266,15 +2035,24 @@ def see_graph(G):
     Args:
         G (networkx Graph): Graph repsenting the network
     """
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(13, 13))
     pos = nx.spring_layout(G)
-    nx.draw_networkx_edge_labels(G, pos)
+    store = attributes(G)
+    labels = {(i, j): {"flow": store.flow[k].item(), "capacity": store.capacity[k].item()}
+              for k, (i, j) in enumerate(store.table.edges) if k not in store.table.removed}
+    nx.draw_networkx_edge_labels(G, pos, edge_labels=labels)
     nx.draw_networkx_labels(G, pos, font_color="w")
     nx.draw(G, pos)
     plt.show()
 
 
-def main():
+def default_graph():
+    """Builds the Network of the lab: a 4 x 5 grid with some of its vertical links
+
+    Returns:
+        networkx Graph: Graph of 20 nodes
+    """
     G = nx.Graph()
     for i in range(4):
         for j in range(4):
@@ -288,8 +2066,15 @@ def main():
     G.add_edge(2, 7)
     G.add_edge(7, 12)
     G.add_edge(12, 17)
-    print(G)
-    
+    return G
+
+
+def default_intensity_matrix():
+    """Gives the intensity matrix of the lab, in packets of PING_STANDARD_SIZE bits
+
+    Returns:
+        2D Integer List: intensity matrix of the 20 nodes of default_graph()
+    """
     N = [
         [0, 2, 8, 4, 7, 8, 2, 7, 3, 4, 7, 6, 1, 7, 1, 5, 3, 6, 2, 7], 
         [7, 0, 6, 6, 2, 3, 0, 4, 3, 0, 7, 3, 8, 6, 5, 3, 0, 2, 1, 6], 
@@ -312,7 +2097,193 @@ def main():
         [1, 1, 7, 7, 2, 5, 0, 7, 3, 5, 7, 4, 4, 6, 5, 7, 8, 1, 0, 6], 
         [1, 6, 0, 5, 6, 8, 8, 2, 5, 7, 2, 8, 1, 7, 3, 0, 0, 5, 2, 0]
         ]
-    N = [[j*PING_STANDARD_SIZE for j in i] for i in N]
+    return N
+
+
+def build_topology(spec):
+    """Builds the Graph described by the topology of a sweep config
+
+    Args:
+        spec (String or Dict): "default", or a Dict with the "type" of the topology
+            ("default", "mesh", "ring", "geometric", "fat_tree" or "edges") and its arguments
+
+    Returns:
+        networkx Graph: Graph of the topology
+    """
+    if isinstance(spec, str):
+        spec = {"type": spec}
+    match spec["type"]:
+        case "default":
+            return default_graph()
+        case "mesh":
+            return mesh_topology(spec["rows"], spec["cols"])
+        case "ring":
+            return ring_topology(spec["nodes"], spec.get("chords", 0), spec.get("seed"))
+        case "geometric":
+            return geometric_topology(spec["nodes"], spec["radius"], spec.get("seed"))
+        case "fat_tree":
+            return fat_tree_topology(spec["k"])
+        case "edges":
+            G = nx.Graph()
+            G.add_edges_from(tuple(edge) for edge in spec["edges"])
+            return G
+    raise ValueError(f"Unknown topology {spec['type']}.")
+
+
+def build_intensity(spec, graph):
+    """Builds the intensity matrix described by a sweep config
+
+    Args:
+        spec (String or Dict): "default", or a Dict with the "type" of the matrix ("default",
+            "random", "sparse" or "matrix"), its arguments and the "scale" of its units in bits,
+            PING_STANDARD_SIZE by default
+        graph (networkx Graph): Graph the matrix is sent over
+
+    Returns:
+        2D Integer List or Dict: intensity matrix of Bits per sec
+    """
+    if isinstance(spec, str):
+        spec = {"type": spec}
+    scale = spec.get("scale", PING_STANDARD_SIZE)
+    match spec["type"]:
+        case "default":
+            N = default_intensity_matrix()
+        case "random":
+            N = gen_intensity_matrix(graph.number_of_nodes(), spec.get("seed"))
+        case "sparse":
+            N = gen_sparse_intensity_matrix(graph.nodes, spec["count"], spec.get("high", 8), spec.get("seed"))
+        case "matrix":
+            N = spec["values"]
+        case _:
+            raise ValueError(f"Unknown intensity matrix {spec['type']}.")
+    if isinstance(N, dict):
+        return {pair: volume*scale for pair, volume in N.items()}
+    return [[j*scale for j in i] for i in N]
+
+
+class ResultWriter(object):
+    """Writes rows of results to a CSV or Parquet file as they come.
+
+    CSV rows are flushed one by one. Parquet needs pyarrow and is written a row
+    group at a time, on every flush().
+    """
+
+    def __init__(self, path, columns):
+        """Initialize a ResultWriter, the format is taken from the extension of the path.
+
+        Args:
+            path (String): path of a .csv or .parquet file
+            columns (Dict): pyarrow type of every column, like "string", "float64" or "int64"
+        """
+        self.path = path
+        self.columns = list(columns)
+        self.rows = []
+        if path.endswith(".parquet"):
+            import pyarrow
+            import pyarrow.parquet
+            self.pyarrow = pyarrow
+            self.schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in columns.items()])
+            self.file = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.pyarrow = None
+            self.file = open(path, "w", newline="")
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(columns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, row):
+        """Write a row given as a Dict of its columns, a missing column is left empty."""
+        if self.pyarrow is None:
+            self.csv.writerow(["" if row.get(column) is None else row[column] for column in self.columns])
+            self.file.flush()
+        else:
+            self.rows.append(row)
+
+    def flush(self):
+        """Write the rows kept so far."""
+        if self.pyarrow is None or not self.rows:
+            return
+        self.file.write_table(self.pyarrow.Table.from_pylist(self.rows, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def load_config(path):
+    """Reads a sweep config from a JSON or TOML file"""
+    if path.endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as file:
+            return tomllib.load(file)
+    with open(path) as file:
+        return json.load(file)
+
+
+def run_sweep(config, output):
+    """Runs the experiments of a sweep config without any interaction
+
+    Every result is written to the output as soon as it is known, one row for
+    every step of every experiment. The config is a Dict with the "topology"
+    and "intensity" of the Network (see build_topology() and build_intensity())
+    and a list of "experiments". Every experiment has its "type" ("experiment1",
+    "experiment2" or "experiment3"), "p" and "m" as a value or a list of them,
+    and optionally "T_max" as a value or a list; without it T_max is the latency
+    of the intact Network at "T_max_m", 4 by default. Any other key, like
+    "iterations", "step", "seed", "workers" or "width", is passed to the experiment.
+
+    Args:
+        config (Dict): sweep config
+        output (String): path of a .csv or .parquet file
+    """
+    experiments = {"experiment1": experiment1, "experiment2": experiment2, "experiment3": experiment3}
+    G = build_topology(config.get("topology", "default"))
+    N = build_intensity(config.get("intensity", "default"), G)
+    flow(G, N)
+    capacity(G)
+    suma = total(N)
+    columns = {"experiment": "string", "p": "float64", "m": "float64", "Tmax": "float64", "iter": "int64",
+               "res": "float64", "low": "float64", "high": "float64", "trials": "int64"}
+    with ResultWriter(output, columns) as writer:
+        for spec in config["experiments"]:
+            spec = dict(spec)
+            name = spec.pop("type")
+            P, M, TMAX = (spec.pop(key, None) for key in ("p", "m", "T_max"))
+            T_max_m = spec.pop("T_max_m", 4)
+            TMAX = [T(G, suma, T_max_m)] if TMAX is None else TMAX
+            for p in P if isinstance(P, list) else [P]:
+                for m in M if isinstance(M, list) else [M]:
+                    for Tmax in TMAX if isinstance(TMAX, list) else [TMAX]:
+                        def report(step, result):
+                            row = {"experiment": name, "p": p, "m": m, "Tmax": Tmax, "iter": step}
+                            if isinstance(result, tuple):
+                                row.update(res=result[0], low=result[1][0], high=result[1][1], trials=result[2])
+                            else:
+                                row["res"] = result
+                            writer.write(row)
+
+                        experiments[name](G, N, Tmax, p, m, report=report, **spec)
+                        writer.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reliability of a Network.")
+    parser.add_argument("config", nargs="?", help="JSON or TOML sweep config to run without the menu")
+    parser.add_argument("-o", "--output", default="results.csv", help="CSV or Parquet file of the results")
+    args = parser.parse_args()
+    if args.config:
+        run_sweep(load_config(args.config), args.output)
+        return
+    from pick import pick
+    G = default_graph()
+    print(G)
+    N = [[j*PING_STANDARD_SIZE for j in i] for i in default_intensity_matrix()]
     flow(G, N)
     capacity(G)
     title = "Choose option: "
@@ -0,0 +1,93 @@
+import networkx as nx
+import numpy as np
+
+from network import (PING_STANDARD_SIZE, Connectivity, DestinationTrees, T, attributes, batch_reliability,
+                     capacity, conditioned_reliability, default_graph, default_intensity_matrix, flow,
+                     gen_sparse_intensity_matrix, geometric_topology, intensity, mesh_topology, reliability,
+                     reroute, routing, shortest_path_trees, total, tree_flows)
+
+
+def lab_network():
+    G = default_graph()
+    N = [[j*PING_STANDARD_SIZE for j in i] for i in default_intensity_matrix()]
+    flow(G, N)
+    capacity(G)
+    return G, N, T(G, total(N), 4)
+
+
+def test_conditioned_reliability_width_close_to_one():
+    G, N, T_max = lab_network()
+    estimate, (low, high), done = conditioned_reliability(G, N, T_max, 0.999, 2, iterations=100, width=0.01, seed=1)
+    assert 0 <= low <= estimate <= high <= 1
+    assert high - low <= 0.01 or done == 10000
+
+
+def edge_flows(graph):
+    table = routing(graph)
+    flows = attributes(graph).values("flow", table)
+    return {frozenset(edge): flows[k] for k, edge in enumerate(table.edges) if k not in table.removed}
+
+
+def test_reroute_matches_flow():
+    G, N, _ = lab_network()
+    for failed in ([(0, 1)], [(7, 12), (14, 19)]):
+        for edge in failed:
+            G.remove_edge(*edge)
+        reroute(G, N, failed)
+        expected = nx.Graph()
+        expected.add_nodes_from(G.nodes)
+        expected.add_edges_from(G.edges)
+        flow(expected, N)
+        flows, expected = edge_flows(G), edge_flows(expected)
+        assert flows.keys() == expected.keys()
+        assert all(np.isclose(flows[edge], expected[edge]) for edge in flows)
+
+
+def test_incremental_reliability_matches_full():
+    G, N, T_max = lab_network()
+    assert (reliability(G, N, T_max, 0.9, 2, iterations=50, seed=3)
+            == reliability(G, N, T_max, 0.9, 2, iterations=50, incremental=False, seed=3))
+
+
+def test_reliability_after_reroute():
+    G, N, T_max = lab_network()
+    G.remove_edge(0, 1)
+    reroute(G, N, [(0, 1)])
+    assert 0 <= reliability(G, N, T_max, 0.95, 2, iterations=20, seed=1) <= 1
+
+
+def test_batch_reliability_with_a_bridge():
+    G = nx.path_graph(4)
+    N = [[0 if i == j else 5*PING_STANDARD_SIZE for j in range(4)] for i in range(4)]
+    flow(G, N)
+    capacity(G)
+    table = routing(G)
+    trees = DestinationTrees(4, table.heads, table.tails, intensity(table, N))
+    alive = np.ones((2, len(table.edges)), dtype=bool)
+    alive[:, 1] = False
+    assert not trees.reroute(alive, np.tile(trees.flows, (2, 1))).any()
+    assert 0 <= batch_reliability(G, N, 2 * T(G, total(N), 4), 0.9, 2, rng=np.random.default_rng(0)) <= 1
+
+
+def test_repaired_trees_match_trees_grown_again():
+    G = mesh_topology(6, 6)
+    N = {pair: volume*PING_STANDARD_SIZE for pair, volume in gen_sparse_intensity_matrix(G.nodes, 72, seed=0).items()}
+    table = routing(G)
+    trees = DestinationTrees(len(table.nodes), table.heads, table.tails, intensity(table, N))
+    alive = np.random.default_rng(1).random((40, len(table.edges))) < 0.8
+    flows = np.tile(trees.flows, (len(alive), 1))
+    connected = trees.reroute(alive, flows)
+    assert (connected == Connectivity(len(table.nodes), table.heads, table.tails).connected(alive)).all()
+    assert connected.sum() > 5
+    for state in np.flatnonzero(connected):
+        distance, next_edge, next_node = shortest_path_trees(len(table.nodes), table.heads, table.tails,
+                                                             alive[state], trees.roots)
+        expected, _ = tree_flows(distance, next_edge, next_node, trees.demand, len(table.edges))
+        assert np.allclose(flows[state], expected)
+
+
+def test_geometric_topology_is_connected():
+    G = geometric_topology(300, 0.03, seed=0)
+    assert nx.number_connected_components(nx.random_geometric_graph(300, 0.03, seed=0)) > 10
+    assert nx.is_connected(G)
+    assert G.number_of_nodes() == 300
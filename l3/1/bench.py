@@ -0,0 +1,176 @@
+import argparse
+import math
+from bisect import bisect_left
+import random
+import time
+
+from frame1 import (CRCS, FRAME_SIZE, GOOD, TERM_SEQ, Deframer, batches, encode_stream, encode_packed_stream,
+                    frames, frames_packed, split_payloads, to_text)
+
+
+def frame_lengths(data, size, crc):
+    """Gives the bits of every frame the payloads are encoded in
+
+    Args:
+        data (String or bytes): payloads as text or packed in bytes
+        size (Integer): bits of a payload
+        crc (CRC): CRC of the frames
+
+    Returns:
+        List: count of bits of every frame, flags included
+    """
+    if isinstance(data, str):
+        return [len(frame) for batch in batches(split_payloads([data], size)) for frame in frames(batch, crc)]
+    return [bits for batch in batches(split_payloads([data], size // 8)) for _, bits in frames_packed(batch, crc)]
+
+
+def noise(rand, length, rate):
+    """Gives the positions of bits hit with a rate per bit, drawn as gaps between hits"""
+    if rate <= 0:
+        return
+    position = -1
+    log = math.log(1 - rate) if rate < 1 else None
+    while True:
+        position += 1 if log is None else 1 + int(math.log(1 - rand.random()) / log)
+        if position >= length:
+            return
+        yield position
+
+
+def channel(encoded, lengths, rand, ber=0.0, burst_rate=0.0, burst_length=16, flag_drop=0.0):
+    """Sends encoded bits through a noisy channel
+
+    Args:
+        encoded (String or bytes): encoded bits as text or packed in bytes
+        lengths (List): count of bits of every frame
+        rand (random Random): source of the errors
+        ber (float, optional): probability of a bit flipping. Defaults to 0.
+        burst_rate (float, optional): probability of a burst starting at a bit. Defaults to 0.
+        burst_length (int, optional): bits of a burst, each flipped with probability 1/2. Defaults to 16.
+        flag_drop (float, optional): probability of a flag being damaged. Defaults to 0.
+
+    Returns:
+        String or bytes: received bits
+    """
+    text = isinstance(encoded, str)
+    received = bytearray(encoded.encode() if text else encoded)
+    length = len(received) if text else 8 * len(received)
+
+    def flip(i):
+        if text:
+            received[i] ^= 1
+        else:
+            received[i >> 3] ^= 0x80 >> (i & 7)
+
+    for i in noise(rand, length, ber):
+        flip(i)
+    for start in noise(rand, length, burst_rate):
+        for i in range(start, min(start + burst_length, length)):
+            if rand.random() < 0.5:
+                flip(i)
+    if flag_drop > 0:
+        start = 0
+        for bits in lengths:
+            for flag in (start, start + bits - len(TERM_SEQ)):
+                if rand.random() < flag_drop:
+                    flip(flag + rand.randrange(1, len(TERM_SEQ) - 1))
+            start += bits
+    return received.decode() if text else bytes(received)
+
+
+def deliveries(sent, received):
+    """Counts the payloads received as they were sent and the ones with an error the CRC missed
+
+    A received payload is delivered if it was sent after the one delivered before it.
+
+    Args:
+        sent (List): payloads sent, in order
+        received (List): payloads of the frames that passed their CRC, in order
+
+    Returns:
+        Tuple: counts of delivered and of undetected wrong payloads
+    """
+    positions = {}
+    for i, payload in enumerate(sent):
+        positions.setdefault(payload, []).append(i)
+    delivered = undetected = 0
+    position = 0
+    for payload in received:
+        indexes = positions.get(payload, [])
+        i = bisect_left(indexes, position)
+        if i < len(indexes):
+            position = indexes[i] + 1
+            delivered += 1
+        else:
+            undetected += 1
+    return delivered, undetected
+
+
+def bench(data, size, crc, rand, **errors):
+    """Encodes payloads, sends them through a noisy channel and decodes them
+
+    Args:
+        data (String or bytes): payloads as text or packed in bytes
+        size (Integer): bits of a payload
+        crc (CRC): CRC of the frames
+        rand (random Random): source of the errors
+        **errors: rates of the channel, see channel()
+
+    Returns:
+        Dict: MB/s of the payloads in every stage, frames sent, delivered, damaged,
+        malformed and undetected, delivery and undetected error rates
+    """
+    text = isinstance(data, str)
+    megabytes = (len(data) / 8 if text else len(data)) / 1e6
+    lengths = frame_lengths(data, size, crc) if errors.get("flag_drop") else []
+    start = time.perf_counter()
+    if text:
+        encoded = ''.join(encode_stream([data], size, crc))
+    else:
+        encoded = b''.join(encode_packed_stream([data], size, crc))
+    encoded_at = time.perf_counter()
+    received = channel(encoded, lengths, rand, **errors)
+    channel_at = time.perf_counter()
+    deframer = Deframer(crc, packed=not text)
+    payloads = [(value, bits) for status, value, bits in deframer.deframe([received]) if status == GOOD]
+    decoded_at = time.perf_counter()
+    if text:
+        sent = [(int(payload, 2), len(payload)) for payload in split_payloads([data], size)]
+    else:
+        sent = [(int.from_bytes(payload, 'big'), 8 * len(payload)) for payload in split_payloads([data], size // 8)]
+    delivered, undetected = deliveries(sent, payloads)
+    return {"encode_mb_s": megabytes / (encoded_at - start), "channel_mb_s": megabytes / (channel_at - encoded_at),
+            "decode_mb_s": megabytes / (decoded_at - channel_at), "sent": len(sent), "delivered": delivered,
+            "damaged": deframer.damaged, "malformed": deframer.malformed, "undetected": undetected,
+            "delivery_rate": delivered / len(sent), "undetected_rate": undetected / max(1, len(payloads))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of framing through a noisy channel.")
+    parser.add_argument("--bytes", type=int, default=1 << 20, help="bytes of payload")
+    parser.add_argument("--size", default=str(FRAME_SIZE), help="bits of the payload of a frame, comma separated")
+    parser.add_argument("--crc", default="crc32", help=f"any of {', '.join(CRCS)}, comma separated")
+    parser.add_argument("--text", action="store_true", help="frame text of '0' and '1' in place of bytes")
+    parser.add_argument("--ber", type=float, default=1e-4, help="probability of a bit flipping")
+    parser.add_argument("--burst-rate", type=float, default=1e-5, help="probability of a burst starting at a bit")
+    parser.add_argument("--burst-length", type=int, default=16, help="bits of a burst")
+    parser.add_argument("--flag-drop", type=float, default=1e-3, help="probability of a flag being damaged")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the payloads and the errors")
+    args = parser.parse_args()
+
+    data = random.Random(args.seed).randbytes(args.bytes)
+    if args.text:
+        data = to_text(int.from_bytes(data, 'big'), 8 * len(data))
+    print(f"{'crc':>7} {'size':>5} {'encode':>9} {'channel':>9} {'decode':>9} {'sent':>8} {'delivered':>9} "
+          f"{'damaged':>8} {'malformed':>9} {'undetected':>10} {'delivery':>8} {'undetected':>10}")
+    for crc in args.crc.split(","):
+        for size in map(int, args.size.split(",")):
+            row = bench(data, size, CRCS[crc], random.Random(args.seed), ber=args.ber, burst_rate=args.burst_rate,
+                        burst_length=args.burst_length, flag_drop=args.flag_drop)
+            print(f"{crc:>7} {size:>5} {row['encode_mb_s']:>6.2f}MB/s {row['channel_mb_s']:>6.2f}MB/s "
+                  f"{row['decode_mb_s']:>6.2f}MB/s {row['sent']:>8} {row['delivered']:>9} {row['damaged']:>8} "
+                  f"{row['malformed']:>9} {row['undetected']:>10} {row['delivery_rate']:>8.4f} {row['undetected_rate']:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
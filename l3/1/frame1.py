@@ -1,65 +1,782 @@
-from crc import Calculator, Crc32
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import argparse
+import zlib
 
 TERM_SEQ = '01111110'
 FRAME_SIZE = 32
+# characters read from a file at once
+CHUNK_SIZE = 1 << 16
+# frames checksummed at once
+BATCH_SIZE = 1024
+# characters or bytes given to a worker at once
+BLOCK_SIZE = 1 << 20
+FLAG = int(TERM_SEQ, 2)
 
-def addCRC(message):
-    calculator = Calculator(Crc32.CRC32)
-    checksum = calculator.checksum(bytes(message, 'utf-8'))
-    calced_crc = ""
-    calced_crc += str(format(checksum, 'b'))
-    while len(calced_crc) < 32 :
-        calced_crc = "0" + calced_crc
-    return message + calced_crc
+class CRC(object):
+    """A CRC whose table is built once, checksumming many messages in one call."""
 
-def encode():
-    count = 0
-    stream = ""
-    output_string = ""
-    with open("origin.txt",'r') as f:
-        stream = f.readline()
-        print(f"origin:  {stream}")
-    with open("encoded.txt",'w') as f:
-        while len(stream) != 0 :
-            if len(stream) >= FRAME_SIZE:
-                output_string = stream[:FRAME_SIZE]
-                stream = stream[FRAME_SIZE:]
+    def __init__(self, width, poly, init, xorout, reflected=True, fast=None):
+        """Initialize a CRC from its parameters.
+
+        Args:
+            width (Integer): bits of the CRC, a multiple of 8
+            poly (Integer): generator polynomial, not reflected
+            init (Integer): register at the start
+            xorout (Integer): mask of the register at the end
+            reflected (bool, optional): bits of a byte come least significant first. Defaults to True.
+            fast (Callable, optional): function giving the same checksum of bytes faster. Defaults to None.
+        """
+        self.width = width
+        self.init = init
+        self.xorout = xorout
+        self.reflected = reflected
+        self.fast = fast
+        mask = (1 << width) - 1
+        poly_r = int(format(poly, f'0{width}b')[::-1], 2)
+        self.table = []
+        for byte in range(256):
+            if reflected:
+                crc = byte
+                for _ in range(8):
+                    crc = crc >> 1 ^ (poly_r if crc & 1 else 0)
+            else:
+                crc = byte << (width - 8)
+                for _ in range(8):
+                    crc = (crc << 1 ^ (poly if crc >> (width - 1) & 1 else 0)) & mask
+            self.table.append(crc)
+        # the register is linear in its start and in the data: after the eight characters
+        # of the text of a byte it is its own update over eight zero bytes, a table for
+        # every byte of it, xored with the update of a zero register over the text
+        self.text_table = [self.update(0, format(byte, '08b').encode()) for byte in range(256)]
+        self.zero_tables = [[self.update(value << shift, bytes(8)) for value in range(256)]
+                            for shift in range(0, width, 8)]
+
+    def update(self, crc, data):
+        """Gives the register after bytes, from the given one"""
+        table = self.table
+        if self.reflected:
+            for byte in data:
+                crc = table[(crc ^ byte) & 0xFF] ^ crc >> 8
+        else:
+            shift = self.width - 8
+            mask = (1 << self.width) - 1
+            for byte in data:
+                crc = table[(crc >> shift ^ byte) & 0xFF] ^ (crc << 8 & mask)
+        return crc
+
+    def checksum(self, data):
+        """Gives the CRC of bytes"""
+        if self.fast is not None:
+            return self.fast(data)
+        return self.update(self.init, data) ^ self.xorout
+
+    def checksums(self, messages):
+        """Gives the CRC of every message, a List of bytes"""
+        return list(map(self.fast or self.checksum, messages))
+
+    def text_update(self, crc, data):
+        """Gives the register after the text of bytes, from the given one, without making the text"""
+        text = self.text_table
+        if self.width == 16:
+            low, high = self.zero_tables
+            for byte in data:
+                crc = low[crc & 0xFF] ^ high[crc >> 8] ^ text[byte]
+        elif self.width == 32:
+            first, second, third, fourth = self.zero_tables
+            for byte in data:
+                crc = (first[crc & 0xFF] ^ second[crc >> 8 & 0xFF] ^ third[crc >> 16 & 0xFF] ^ fourth[crc >> 24]
+                       ^ text[byte])
+        else:
+            zeros = list(enumerate(self.zero_tables))
+            for byte in data:
+                register = text[byte]
+                for i, table in zeros:
+                    register ^= table[crc >> 8 * i & 0xFF]
+                crc = register
+        return crc
+
+    def text_checksum(self, value, bits):
+        """Gives the CRC of bits as text of '0' and '1'
+
+        A fast CRC is still faster over the text than a loop here over the bytes.
+        """
+        if self.fast is not None:
+            return self.fast(to_text(value, bits).encode())
+        rest = bits % 8
+        crc = self.update(self.init, to_text(value >> bits - rest, rest).encode())
+        data = (value & ((1 << bits - rest) - 1)).to_bytes((bits - rest) // 8, 'big')
+        return self.text_update(crc, data) ^ self.xorout
+
+    def text_checksums(self, messages):
+        """Gives the CRC of every message, a List of (bits, count of bits), as text of '0' and '1'"""
+        return [self.text_checksum(value, bits) for value, bits in messages]
+
+CRC32 = CRC(32, 0x04C11DB7, 0xFFFFFFFF, 0xFFFFFFFF, fast=zlib.crc32)
+CRC32C = CRC(32, 0x1EDC6F41, 0xFFFFFFFF, 0xFFFFFFFF)
+# FCS-16 of HDLC
+CRC16 = CRC(16, 0x1021, 0xFFFF, 0xFFFF)
+CRCS = {"crc32": CRC32, "crc32c": CRC32C, "crc16": CRC16}
+
+def addCRC(message, crc=CRC32):
+    return message + to_text(crc.checksum(message.encode()), crc.width)
+
+def stuffing_table():
+    """Bits sent for every byte after every run of ones, as (bits, count of bits, run of ones after it)"""
+    table = []
+    for ones in range(5):
+        row = []
+        for byte in range(256):
+            value = count = 0
+            run = ones
+            for shift in range(7, -1, -1):
+                bit = byte >> shift & 1
+                value = value << 1 | bit
+                count += 1
+                run = run + 1 if bit else 0
+                if run == 5:
+                    value <<= 1
+                    count += 1
+                    run = 0
+            row.append((value, count, run))
+        table.append(row)
+    return table
+
+def unstuffing_table():
+    """Bits received for every byte after every run of ones
+
+    An entry is (bits, count of bits, run of ones after it), or for a byte in
+    which a flag ends (bits up to the flag, their count, bits after it, their
+    count, run of ones after it). A byte in which an abort or a second flag
+    ends has None.
+    """
+    table = []
+    for ones in range(7):
+        row = []
+        for byte in range(256):
+            value = count = 0
+            run = ones
+            before = None
+            for shift in range(7, -1, -1):
+                bit = byte >> shift & 1
+                if run == 6:
+                    if bit or before is not None:
+                        break
+                    before = (value, count)
+                    value = count = run = 0
+                elif bit:
+                    run += 1
+                    if run <= 5:
+                        value = value << 1 | 1
+                        count += 1
+                else:
+                    if run != 5:
+                        value <<= 1
+                        count += 1
+                    run = 0
+            else:
+                row.append((value, count, run) if before is None else (*before, value, count, run))
+                continue
+            row.append(None)
+        table.append(row)
+    return table
+
+STUFF = stuffing_table()
+UNSTUFF = unstuffing_table()
+
+GOOD = "good"
+DAMAGED = "damaged"
+MALFORMED = "malformed"
+
+class Deframer(object):
+    """Finds, unstuffs and checks frames in one pass over a stream of encoded bits.
+
+    Bits are unstuffed and flags found a byte at a time, only a byte in which
+    an abort (seven ones) ends is looked at bit by bit. After an abort or a frame
+    longer than max_bits the bits are dropped up to the next flag, so a
+    damaged flag costs the frames around it and no more. Every frame gives a
+    result (status, bits, count of bits) holding the payload of a GOOD frame
+    and the unstuffed bits of a DAMAGED one (its CRC does not match). A
+    MALFORMED frame (aborted, too short for its CRC, too long or not closed
+    by a flag) holds no bits. The CRC of a frame of the text format is over
+    the text of its payload, of a packed frame over its bytes.
+    """
+
+    def __init__(self, crc=CRC32, max_bits=1 << 20, packed=False):
+        """Initialize a Deframer hunting for the first flag.
+
+        Args:
+            crc (CRC, optional): CRC of the frames. Defaults to CRC32.
+            max_bits (Integer, optional): most bits of a frame. Defaults to 1 << 20.
+            packed (bool, optional): the frames are packed ones. Defaults to False.
+        """
+        self.crc = crc
+        self.max_bits = max_bits
+        self.packed = packed
+        self.good = self.damaged = self.malformed = 0
+        self.acc = self.count = self.ones = 0
+        self.hunting = True
+        # bits fed that do not make a whole byte yet
+        self.rest = self.rest_bits = 0
+        # frames found and not checked yet, None for a malformed one
+        self.found = []
+
+    def step(self, bit):
+        """Takes the next bit of the stream"""
+        if bit:
+            self.ones += 1
+            if self.ones <= 5:
+                self.acc = self.acc << 1 | 1
+                self.count += 1
+            elif self.ones == 7:
+                # an abort right after a flag is only the line going idle
+                if not self.hunting and self.count > 5:
+                    self.found.append(None)
+                self.acc = self.count = 0
+                self.hunting = True
+            return
+        if self.ones == 6:
+            # the 0 and five ones of the flag were taken as bits of the frame
+            if not self.hunting and self.count > 6:
+                self.found.append((self.acc >> 6, self.count - 6))
+            self.acc = self.count = 0
+            self.hunting = False
+        elif self.ones != 5 and self.ones < 7:
+            self.acc <<= 1
+            self.count += 1
+        self.ones = 0
+
+    def scan(self, data):
+        """Takes the next bytes of the stream"""
+        table = UNSTUFF
+        found = self.found
+        acc, count, ones, hunting = self.acc, self.count, self.ones, self.hunting
+        for byte in data:
+            entry = table[ones][byte] if ones < 7 else None
+            if entry is None:
+                self.acc, self.count, self.ones, self.hunting = acc, count, ones, hunting
+                for shift in range(7, -1, -1):
+                    self.step(byte >> shift & 1)
+                acc, count, ones, hunting = self.acc, self.count, self.ones, self.hunting
+            elif len(entry) == 3:
+                value, bits, ones = entry
+                acc = acc << bits | value
+                count += bits
+            else:
+                value, bits, rest, rest_bits, ones = entry
+                acc = acc << bits | value
+                count += bits
+                if not hunting and count > 6:
+                    found.append((acc >> 6, count - 6))
+                acc, count, hunting = rest, rest_bits, False
+        self.acc, self.count, self.ones, self.hunting = acc, count, ones, hunting
+        if self.hunting:
+            self.acc = self.count = 0
+        elif self.count > self.max_bits:
+            self.found.append(None)
+            self.acc = self.count = 0
+            self.hunting = True
+
+    def checksums(self, messages):
+        """Gives the CRC of every message, a List of (bits, count of bits), None for a packed one of partial bytes"""
+        if not self.packed:
+            return self.crc.text_checksums(messages)
+        whole = [value.to_bytes(bits // 8, 'big') for value, bits in messages if bits % 8 == 0]
+        checksums = iter(self.crc.checksums(whole))
+        return [next(checksums) if bits % 8 == 0 else None for _, bits in messages]
+
+    def check(self):
+        """Checks the CRC of the frames found so far in one batch
+
+        Returns:
+            List: result of every frame
+        """
+        found, self.found = self.found, []
+        width = self.crc.width
+        frames = [frame for frame in found if frame is not None and frame[1] >= width]
+        checksums = iter(self.checksums([(value >> width, bits - width) for value, bits in frames]))
+        results = []
+        for frame in found:
+            if frame is None or frame[1] < width:
+                self.malformed += 1
+                results.append((MALFORMED, 0, 0))
+            elif next(checksums) == frame[0] & ((1 << width) - 1):
+                self.good += 1
+                results.append((GOOD, frame[0] >> width, frame[1] - width))
+            else:
+                self.damaged += 1
+                results.append((DAMAGED, *frame))
+        return results
+
+    def feed(self, data):
+        """Takes the next bytes of the stream and gives the result of every frame ended in them"""
+        self.scan(data)
+        return self.check()
+
+    def feed_bits(self, value, bits):
+        """Takes the next bits of the stream and gives the result of every frame ended in them"""
+        value |= self.rest << bits
+        bits += self.rest_bits
+        self.rest_bits = bits % 8
+        self.rest = value & ((1 << self.rest_bits) - 1)
+        return self.feed((value >> self.rest_bits).to_bytes(bits // 8, 'big'))
+
+    def feed_text(self, chunk):
+        """Takes the next bits of the stream as text and gives the result of every frame ended in them"""
+        return self.feed_bits(int(chunk, 2), len(chunk)) if chunk else []
+
+    def flush(self):
+        """Takes the bits fed that do not make a whole byte and gives the result of every frame ended in them"""
+        for shift in range(self.rest_bits - 1, -1, -1):
+            self.step(self.rest >> shift & 1)
+        self.rest = self.rest_bits = 0
+        return self.check()
+
+    def finish(self):
+        """Ends the stream and gives the result of the frames ended by it
+
+        Fewer bits than a flag after the last one are padding, more are a frame
+        that was never closed.
+        """
+        results = self.flush()
+        if not self.hunting and self.count >= len(TERM_SEQ):
+            self.found.append(None)
+        self.acc = self.count = self.ones = 0
+        self.hunting = True
+        return results + self.check()
+
+    def deframe(self, chunks):
+        """Gives the result of every frame in a stream of encoded bits, as text or packed in bytes"""
+        for chunk in chunks:
+            yield from self.feed_text(chunk) if isinstance(chunk, str) else self.feed(chunk)
+        yield from self.finish()
+
+def read_chunks(path, size=CHUNK_SIZE):
+    """Reads a file of bits in chunks, so any size of it takes the same memory
+
+    Args:
+        path (String): path of the file
+        size (Integer, optional): most characters of a chunk. Defaults to CHUNK_SIZE.
+
+    Yields:
+        String: next chunk of the bits, without line breaks
+    """
+    with open(path, 'r') as f:
+        while chunk := f.read(size):
+            yield chunk.replace("\n", "").replace("\r", "")
+
+def read_bytes(path, size=CHUNK_SIZE):
+    """Reads a binary file in chunks of at most size bytes"""
+    with open(path, 'rb') as f:
+        while chunk := f.read(size):
+            yield chunk
+
+def batches(items, size=BATCH_SIZE):
+    """Groups items into Lists of at most size of them"""
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+def split_payloads(chunks, size=FRAME_SIZE):
+    """Cuts a stream of bits into the payloads of frames
+
+    Args:
+        chunks (Iterable): chunks of the bits, as Strings or packed in bytes
+        size (Integer, optional): bits of a payload, or bytes when packed. Defaults to FRAME_SIZE.
+
+    Yields:
+        String or bytes: next payload, only the last one may be shorter
+    """
+    buffer = None
+    for chunk in chunks:
+        buffer = chunk if buffer is None else buffer + chunk
+        full = len(buffer) - len(buffer) % size
+        for i in range(0, full, size):
+            yield buffer[i:i + size]
+        buffer = buffer[full:]
+    if buffer:
+        yield buffer
+
+def frames(payloads, crc=CRC32):
+    """Adds the CRC to every payload, stuffs their bits and puts them between flags
+
+    Args:
+        payloads (List): payloads of the frames
+        crc (CRC, optional): CRC of the frames. Defaults to CRC32.
+
+    Returns:
+        List: Strings of the frames
+    """
+    checksums = crc.checksums([payload.encode() for payload in payloads])
+    return [TERM_SEQ + (payload + to_text(checksum, crc.width)).replace("11111", "111110") + TERM_SEQ
+            for payload, checksum in zip(payloads, checksums)]
+
+def encode_stream(chunks, size=FRAME_SIZE, crc=CRC32):
+    """Frames a stream of bits as it is read
+
+    Args:
+        chunks (Iterable): chunks of the bits
+        size (Integer, optional): bits of a payload. Defaults to FRAME_SIZE.
+        crc (CRC, optional): CRC of the frames. Defaults to CRC32.
+
+    Yields:
+        String: next encoded frame
+    """
+    for batch in batches(split_payloads(chunks, size)):
+        yield from frames(batch, crc)
+
+def decode_stream(chunks, crc=CRC32):
+    """Takes the payloads out of a stream of encoded bits as it is read
+
+    Args:
+        chunks (Iterable): chunks of the encoded bits
+        crc (CRC, optional): CRC of the frames. Defaults to CRC32.
+
+    Yields:
+        String: payload of the next frame, None if the frame is damaged
+    """
+    for status, value, bits in Deframer(crc).deframe(chunks):
+        yield to_text(value, bits) if status == GOOD else None
+
+def pack(pieces):
+    """Packs pieces of bits into bytes, the last byte is padded with zeros
+
+    Args:
+        pieces (Iterable): pieces of the bits as (bits, count of bits)
+
+    Yields:
+        bytes: next chunk of the packed bits
+    """
+    out = bytearray()
+    acc = count = 0
+    for value, bits in pieces:
+        acc = acc << bits | value
+        count += bits
+        if count >= 8:
+            rest = count % 8
+            out += (acc >> rest).to_bytes(count // 8, 'big')
+            acc &= (1 << rest) - 1
+            count = rest
+            if len(out) >= CHUNK_SIZE:
+                yield bytes(out)
+                out.clear()
+    if count:
+        out.append(acc << (8 - count))
+    if out:
+        yield bytes(out)
+
+def to_text(value, bits):
+    """Gives bits as a String of '0' and '1'"""
+    return format(value, f'0{bits}b') if bits else ""
+
+def frames_packed(payloads, crc=CRC32):
+    """Adds the CRC to every payload, stuffs their bits and puts them between flags
+
+    The CRC is over the bytes of the payload, not over its text as in frames().
+
+    Args:
+        payloads (List): payloads of the frames as bytes
+        crc (CRC, optional): CRC of the frames. Defaults to CRC32.
+
+    Returns:
+        List: bits of every frame and their count
+    """
+    checksums = crc.checksums(payloads)
+    result = []
+    for payload, checksum in zip(payloads, checksums):
+        value, count, ones = FLAG, 8, 0
+        for byte in payload + checksum.to_bytes(crc.width // 8, 'big'):
+            bits, length, ones = STUFF[ones][byte]
+            value = value << length | bits
+            count += length
+        result.append((value << 8 | FLAG, count + 8))
+    return result
+
+def encode_packed_stream(chunks, size=FRAME_SIZE, crc=CRC32):
+    """Frames a stream of bytes as it is read, the frames are packed in bytes
+
+    Args:
+        chunks (Iterable): chunks of the bytes
+        size (Integer, optional): bits of a payload, a multiple of 8. Defaults to FRAME_SIZE.
+        crc (CRC, optional): CRC of the frames. Defaults to CRC32.
+
+    Yields:
+        bytes: next chunk of the encoded bits
+    """
+    batched = batches(split_payloads(chunks, size // 8))
+    yield from pack(frame for batch in batched for frame in frames_packed(batch, crc))
+
+def decode_packed_stream(chunks, crc=CRC32):
+    """Takes the payloads out of a stream of encoded bits packed in bytes as it is read
+
+    Args:
+        chunks (Iterable): chunks of the encoded bytes
+        crc (CRC, optional): CRC of the frames. Defaults to CRC32.
+
+    Yields:
+        Tuple: bits of the payload of the next frame and their count, None if the frame is damaged
+    """
+    for status, value, bits in Deframer(crc, packed=True).deframe(chunks):
+        yield (value, bits) if status == GOOD else None
+
+def pack_stream(chunks):
+    """Packs a stream of bits as text into bytes, the last byte is padded with zeros"""
+    return pack((int(chunk, 2), len(chunk)) for chunk in chunks if chunk)
+
+def unpack_stream(chunks):
+    """Gives a stream of bits packed in bytes as text"""
+    for chunk in chunks:
+        yield to_text(int.from_bytes(chunk, 'big'), 8 * len(chunk))
+
+def to_binary(text="encoded.txt", binary="encoded.bin", crc=CRC32, size=FRAME_SIZE):
+    """Converts a file of frames as text into a binary file of packed frames
+
+    The payloads of the good frames are framed again, as the CRC of a packed
+    frame is over bytes and not over text. A last payload of partial bytes is
+    padded with zeros.
+    """
+    payloads = (payload for payload in decode_stream(read_chunks(text), crc) if payload is not None)
+    with open(binary, 'wb') as f:
+        for chunk in encode_packed_stream(pack_stream(payloads), size, crc):
+            f.write(chunk)
+
+def from_binary(binary="encoded.bin", text="encoded.txt", crc=CRC32, size=FRAME_SIZE):
+    """Converts a binary file of packed frames into a file of frames as text, see to_binary()"""
+    payloads = (payload for payload in decode_packed_stream(read_bytes(binary), crc) if payload is not None)
+    with open(text, 'w') as f:
+        for frame in encode_stream((to_text(value, bits) for value, bits in payloads), size, crc):
+            f.write(frame)
+
+def run_blocks(function, blocks, workers=None):
+    """Runs a function on blocks of work and gives the results in the order of the blocks
+
+    With more than one worker the blocks run in a pool of processes, with at
+    most two per worker waiting for their turn, so memory stays bounded.
+
+    Args:
+        function (Callable): function run on every block
+        blocks (Iterable): Tuples of the arguments of every block
+        workers (int, optional): number of processes. Defaults to running in this one.
+
+    Yields:
+        result of the next block
+    """
+    if not workers or workers <= 1:
+        for block in blocks:
+            yield function(*block)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for block in blocks:
+            pending.append(executor.submit(function, *block))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def join_bits(pieces):
+    """Joins pieces of bits given as (bits, count of bits) into one"""
+    data = b''.join(pack(pieces))
+    bits = sum(count for _, count in pieces)
+    return int.from_bytes(data, 'big') >> (8 * len(data) - bits), bits
+
+def encode_block(block, size, crc):
+    """Frames a block of bits
+
+    Args:
+        block (String or bytes): bits as text or packed in bytes, a whole number of payloads but for the last block
+        size (Integer): bits of a payload
+        crc (CRC): CRC of the frames
+
+    Returns:
+        String of the frames, or with bytes the bits of the frames and their count
+    """
+    if isinstance(block, str):
+        return ''.join(encode_stream([block], size, crc))
+    payloads = split_payloads([block], size // 8)
+    return join_bits([frame for batch in batches(payloads) for frame in frames_packed(batch, crc)])
+
+def decode_block(block, skip, crc, last):
+    """Deframes a block of encoded bits cut by flag_blocks()
+
+    Args:
+        block (String or bytes): encoded bits as text or packed in bytes
+        skip (Integer): bits of the first byte before the block begins
+        crc (CRC): CRC of the frames
+        last (bool): the block ends the stream
+
+    Returns:
+        Tuple: payloads of the good frames (a String, or with bytes their bits and
+        count of bits) and the counts of good, damaged and malformed frames
+    """
+    deframer = Deframer(crc, packed=not isinstance(block, str))
+    if isinstance(block, str):
+        results = deframer.feed_text(block)
+    else:
+        bits = 8 * len(block) - skip
+        results = deframer.feed_bits(int.from_bytes(block, 'big') & ((1 << bits) - 1), bits)
+    results += deframer.finish() if last else deframer.flush()
+    payloads = [(value, bits) for status, value, bits in results if status == GOOD]
+    if isinstance(block, str):
+        payloads = ''.join(to_text(value, bits) for value, bits in payloads)
+    else:
+        payloads = join_bits(payloads)
+    return payloads, deframer.good, deframer.damaged, deframer.malformed
+
+def find_flag(data, start):
+    """Gives the first bit at or after start where a flag begins, -1 if there is none
+
+    Args:
+        data (String or bytes): encoded bits as text or packed in bytes
+        start (Integer): bit to search from
+
+    Returns:
+        Integer: bit where the flag begins
+    """
+    if isinstance(data, str):
+        return data.find(TERM_SEQ, start)
+    # a few bytes at a time as text, each piece with the first byte of the next one
+    window = 1 << 12
+    for first in range(start // 8, len(data), window):
+        piece = data[first:first + window + 1]
+        found = to_text(int.from_bytes(piece, 'big'), 8 * len(piece)).find(TERM_SEQ, max(0, start - 8 * first))
+        if found >= 0:
+            return 8 * first + found
+    return -1
+
+def flag_blocks(chunks, size=BLOCK_SIZE):
+    """Cuts a stream of encoded bits into blocks that can be deframed on their own
+
+    Stuffed bits never hold six ones in a row, so every flag is one to the
+    Deframer and leaves it in the same state, however it got there. A block
+    begins with a flag, but for the first one, and ends with the flag after
+    at least size characters or bytes, so the frames deframed from the blocks
+    are the frames of the whole stream. With no flag in four times size, more
+    than the longest frame a Deframer keeps for a size of BLOCK_SIZE, a block
+    is cut anyway.
+
+    Args:
+        chunks (Iterable): chunks of the encoded bits, as Strings or packed in bytes
+        size (Integer, optional): fewest characters or bytes of a block but for the last one.
+            Defaults to BLOCK_SIZE.
+
+    Yields:
+        Tuple: next block, the bits of its first byte before it begins when packed,
+        and whether it ends the stream
+    """
+    buffer = None
+    # bit of the buffer where the next block begins
+    start = 0
+    for chunk in chunks:
+        buffer = chunk if buffer is None else buffer + chunk
+        unit = 1 if isinstance(buffer, str) else 8
+        while True:
+            flag = find_flag(buffer, start + unit * size)
+            if flag >= 0:
+                end = flag + len(TERM_SEQ)
+            elif unit * len(buffer) - start >= 4 * unit * size:
+                flag = end = start + 4 * unit * size
             else:
-                output_string = stream
-                stream = ""
-            output_string = addCRC(output_string)
-            output_string = output_string.replace("11111", "111110")
-            output_string = TERM_SEQ + output_string + TERM_SEQ
-            #print(f"output_string: {output_string}")
-            f.write(output_string)
-            count += 1
+                break
+            yield buffer[start // unit:-(-end // unit)], start % unit, False
+            buffer, start = buffer[flag // unit:], flag % unit
+    if buffer:
+        yield buffer[start // unit:], start % unit, True
+
+def encode(origin="origin.txt", encoded="encoded.txt", crc=CRC32, size=FRAME_SIZE, workers=None):
+    count = 0
+    with open(encoded, 'w') as f:
+        if workers and workers > 1:
+            def blocks():
+                nonlocal count
+                for block in split_payloads(read_chunks(origin), BLOCK_SIZE - BLOCK_SIZE % size):
+                    count += -(-len(block) // size)
+                    yield block, size, crc
+
+            for output_string in run_blocks(encode_block, blocks(), workers):
+                f.write(output_string)
+        else:
+            for output_string in encode_stream(read_chunks(origin), size, crc):
+                #print(f"output_string: {output_string}")
+                f.write(output_string)
+                count += 1
     print(f"frames sent = {count}")
-        
-def decode():
-    calculator = Calculator(Crc32.CRC32)
-    encoded = ""
-    with open("encoded.txt",'r') as f:
-        encoded = f.readline()
-        print(f"encoded: {encoded}")
-    frames = []
-    frames = encoded.split(TERM_SEQ+TERM_SEQ)
-    frames = [x.replace(TERM_SEQ, "") for x in frames]
-    print(f"frames recived = {len(frames)}")
-    with open("decoded.txt",'w') as f:
-        for frame in frames:
-            frame = frame.replace("111110", "11111")
-            crcRec = frame[(len(frame) - 32):]
-            frame = frame[:(len(frame) - 32)]
-            if calculator.verify(bytes(frame, 'utf-8'), int(bytes(crcRec, 'utf-8'), 2)):
-                f.write(frame)
-    with open("decoded.txt",'r') as f:
-        print(f"decoded: {f.read()}")
-    with open("origin.txt",'r') as f:
-        print(f"origin:  {f.read()}")
+
+def decode(encoded="encoded.txt", decoded="decoded.txt", crc=CRC32, size=FRAME_SIZE, workers=None):
+    deframer = Deframer(crc)
+    with open(decoded, 'w') as f:
+        if workers and workers > 1:
+            blocks = ((block, skip, crc, last) for block, skip, last in flag_blocks(read_chunks(encoded, BLOCK_SIZE)))
+            for payloads, good, damaged, malformed in run_blocks(decode_block, blocks, workers):
+                f.write(payloads)
+                deframer.good += good
+                deframer.damaged += damaged
+                deframer.malformed += malformed
+        else:
+            for status, value, bits in deframer.deframe(read_chunks(encoded)):
+                if status == GOOD:
+                    f.write(to_text(value, bits))
+    print(f"frames recived = {deframer.good + deframer.damaged + deframer.malformed}")
+    print(f"frames good = {deframer.good}, damaged = {deframer.damaged}, malformed = {deframer.malformed}")
+
+def encode_packed(origin="origin.bin", encoded="encoded.bin", crc=CRC32, size=FRAME_SIZE, workers=None):
+    if size % 8:
+        raise ValueError(f"Packed payloads are whole bytes, not {size} bits.")
+    total = 0
+
+    def chunks():
+        nonlocal total
+        for chunk in read_bytes(origin):
+            total += len(chunk)
+            yield chunk
+
+    if workers and workers > 1:
+        blocks = ((block, size, crc) for block in split_payloads(chunks(), BLOCK_SIZE - BLOCK_SIZE % (size // 8)))
+        encoded_chunks = pack(run_blocks(encode_block, blocks, workers))
+    else:
+        encoded_chunks = encode_packed_stream(chunks(), size, crc)
+    with open(encoded, 'wb') as f:
+        for chunk in encoded_chunks:
+            f.write(chunk)
+    print(f"frames sent = {-(-total * 8 // size)}")
+
+def decode_packed(encoded="encoded.bin", decoded="decoded.bin", crc=CRC32, size=FRAME_SIZE, workers=None):
+    deframer = Deframer(crc, packed=True)
+    if workers and workers > 1:
+        def payloads():
+            blocks = ((block, skip, crc, last) for block, skip, last in flag_blocks(read_bytes(encoded, BLOCK_SIZE)))
+            for bits, good, damaged, malformed in run_blocks(decode_block, blocks, workers):
+                deframer.good += good
+                deframer.damaged += damaged
+                deframer.malformed += malformed
+                yield bits
+    else:
+        def payloads():
+            for status, value, bits in deframer.deframe(read_bytes(encoded)):
+                if status == GOOD:
+                    yield value, bits
+    with open(decoded, 'wb') as f:
+        for chunk in pack(payloads()):
+            f.write(chunk)
+    print(f"frames recived = {deframer.good + deframer.damaged + deframer.malformed}")
+    print(f"frames good = {deframer.good}, damaged = {deframer.damaged}, malformed = {deframer.malformed}")
 
 def main():
-    #encode()
-    decode()
+    parser = argparse.ArgumentParser(description="Frames bits with CRC and bit stuffing.")
+    parser.add_argument("action", nargs="?", default="decode", choices=["encode", "decode"])
+    parser.add_argument("--packed", action="store_true", help="binary files in place of text of '0' and '1'")
+    parser.add_argument("-i", "--input", help="file to read, origin or encoded by default")
+    parser.add_argument("-o", "--output", help="file to write, encoded or decoded by default")
+    parser.add_argument("--size", type=int, default=FRAME_SIZE, help="bits of the payload of a frame")
+    parser.add_argument("--crc", default="crc32", choices=list(CRCS))
+    parser.add_argument("--workers", type=int, help="number of processes, one by default")
+    args = parser.parse_args()
+    extension = ".bin" if args.packed else ".txt"
+    source, target = ("origin", "encoded") if args.action == "encode" else ("encoded", "decoded")
+    function = {("encode", False): encode, ("decode", False): decode,
+                ("encode", True): encode_packed, ("decode", True): decode_packed}[args.action, args.packed]
+    function(args.input or source + extension, args.output or target + extension, CRCS[args.crc], args.size, args.workers)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
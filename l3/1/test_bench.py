@@ -0,0 +1,30 @@
+import random
+
+from bench import bench, channel, deliveries, frame_lengths, noise
+from frame1 import CRC32
+
+
+def test_deliveries_follow_the_order_sent():
+    # a payload sent again later is delivered, one that was never sent is not
+    assert deliveries([1, 2, 3, 2], [2, 9, 2, 1]) == (2, 2)
+
+
+def test_noise_hits_at_its_rate():
+    hits = list(noise(random.Random(0), 100000, 0.01))
+    assert hits == sorted(set(hits)) and 900 < len(hits) < 1100
+    assert list(noise(random.Random(0), 10, 0)) == [] and list(noise(random.Random(0), 10, 1)) == list(range(10))
+
+
+def test_a_clean_channel_delivers_everything():
+    data = random.Random(0).randbytes(4000)
+    assert channel(data, [], random.Random(0)) == data
+    row = bench(data, 32, CRC32, random.Random(0))
+    assert row["delivered"] == row["sent"] == 1000 and row["damaged"] == row["undetected"] == 0
+
+
+def test_a_noisy_channel_loses_frames():
+    data = random.Random(0).randbytes(4000)
+    lengths = frame_lengths(data, 32, CRC32)
+    assert len(lengths) == 1000
+    row = bench(data, 32, CRC32, random.Random(0), ber=1e-3, flag_drop=0.01)
+    assert 0 < row["delivered"] < row["sent"] and row["damaged"] > 0 and row["undetected"] == 0
@@ -0,0 +1,100 @@
+import random
+
+from frame1 import (CRC, CRC16, CRC32, CRC32C, DAMAGED, GOOD, MALFORMED, TERM_SEQ, Deframer, decode, decode_block,
+                    decode_packed_stream, decode_stream, encode, encode_packed, encode_packed_stream, encode_stream,
+                    flag_blocks, frames, from_binary, pack, split_payloads, to_binary, to_text)
+
+
+def random_bits(count, seed=0):
+    return to_text(random.Random(seed).getrandbits(count), count)
+
+
+def test_streamed_frames_match_whole_frames():
+    bits = random_bits(1000)
+    encoded = ''.join(frames(list(split_payloads([bits]))))
+    assert ''.join(encode_stream([bits[i:i + 37] for i in range(0, len(bits), 37)])) == encoded
+    assert ''.join(decode_stream([encoded[i:i + 41] for i in range(0, len(encoded), 41)])) == bits
+
+
+def test_encode_and_decode_files(tmp_path):
+    bits = random_bits(5000)
+    (tmp_path / "origin.txt").write_text(bits[:2500] + "\n" + bits[2500:])
+    encode(tmp_path / "origin.txt", tmp_path / "encoded.txt")
+    decode(tmp_path / "encoded.txt", tmp_path / "decoded.txt")
+    assert (tmp_path / "decoded.txt").read_text() == bits
+
+
+def test_crc_check_values():
+    for crc, check in ((CRC32, 0xCBF43926), (CRC32C, 0xE3069283), (CRC16, 0x906E)):
+        assert crc.checksum(b'123456789') == check
+    messages = [random.Random(k).randbytes(k) for k in range(40)]
+    # the table gives what zlib gives
+    table = CRC(32, 0x04C11DB7, 0xFFFFFFFF, 0xFFFFFFFF)
+    assert table.checksums(messages) == CRC32.checksums(messages) == [CRC32.checksum(m) for m in messages]
+    for crc in (CRC32, CRC32C, CRC16):
+        texts = [random_bits(k, k) for k in range(1, 80)]
+        assert (crc.text_checksums([(int(text, 2), len(text)) for text in texts])
+                == [crc.checksum(text.encode()) for text in texts])
+
+
+def test_a_damaged_flag_costs_only_its_frame():
+    sent = frames(list(split_payloads([random_bits(320)])))
+    # a bit of the flag closing the third frame, the fourth frame opens with its own
+    flag = sum(map(len, sent[:3])) - 5
+    encoded = ''.join(sent)
+    encoded = encoded[:flag] + ("1" if encoded[flag] == "0" else "0") + encoded[flag + 1:]
+    assert [status for status, _, _ in Deframer().deframe([encoded])] == [GOOD] * 2 + [DAMAGED] + [GOOD] * 7
+    aborted = TERM_SEQ + "0101" + "1111111" + TERM_SEQ + frames(["1010"])[0]
+    assert [status for status, _, _ in Deframer().deframe([aborted])] == [MALFORMED, GOOD]
+
+
+def test_feeding_in_pieces_matches_feeding_at_once():
+    encoded = ''.join(frames(list(split_payloads([random_bits(2000)]))))
+    encoded = encoded[:500] + "1111111" + encoded[500:]
+    whole = list(Deframer().deframe([encoded]))
+    assert list(Deframer().deframe(list(encoded))) == whole
+    assert list(Deframer().deframe([encoded[i:i + 13] for i in range(0, len(encoded), 13)])) == whole
+    assert MALFORMED in [status for status, _, _ in whole]
+
+
+def test_blocks_cut_at_flags_decode_as_the_whole_stream():
+    bits = random_bits(4000)
+    encoded = ''.join(encode_stream([bits]))
+    packed = b''.join(encode_packed_stream([int(bits, 2).to_bytes(500, 'big')]))
+    for stream, size in ((encoded, 300), (packed, 40)):
+        payloads = [decode_block(block, skip, CRC32, last)[0] for block, skip, last in flag_blocks([stream], size)]
+        if isinstance(stream, str):
+            assert len(payloads) > 2 and ''.join(payloads) == bits
+        else:
+            assert len(payloads) > 2 and b''.join(pack(payloads)) == int(bits, 2).to_bytes(500, 'big')
+
+
+def test_workers_give_the_same_files(tmp_path):
+    data = random.Random(0).randbytes(3000)
+    (tmp_path / "origin.bin").write_bytes(data)
+    encode_packed(tmp_path / "origin.bin", tmp_path / "one.bin")
+    encode_packed(tmp_path / "origin.bin", tmp_path / "two.bin", workers=2)
+    assert (tmp_path / "one.bin").read_bytes() == (tmp_path / "two.bin").read_bytes()
+
+
+def test_packed_frames_carry_the_crc_of_their_bytes():
+    for crc in (CRC32, CRC16):
+        encoded = b''.join(encode_packed_stream([b'123456789'], 72, crc))
+        assert list(decode_packed_stream([encoded], crc)) == [(int.from_bytes(b'123456789', 'big'), 72)]
+        # the text format checks the CRC of the text of the payload
+        assert [status for status, _, _ in Deframer(crc).deframe([encoded])] == [DAMAGED]
+    # neither the payload nor its FCS-16, the check value 0x906E, holds five ones in a row
+    assert b''.join(encode_packed_stream([b'123456789'], 72, CRC16)) == b'~123456789\x90\x6e~'
+
+
+def test_binary_conversion_keeps_the_payloads(tmp_path):
+    data = random.Random(0).randbytes(1001)
+    text = tmp_path / "encoded.txt"
+    text.write_text(''.join(encode_stream([to_text(int.from_bytes(data, 'big'), 8 * len(data))])))
+    to_binary(text, tmp_path / "encoded.bin")
+    payloads = list(decode_packed_stream([(tmp_path / "encoded.bin").read_bytes()]))
+    assert b''.join(pack(payloads)) == data
+    from_binary(tmp_path / "encoded.bin", tmp_path / "back.txt")
+    assert (tmp_path / "back.txt").read_text() == text.read_text()
+    assert all(status == GOOD for status, _, _ in Deframer().deframe([text.read_text()]))
+    assert ''.join(decode_stream([text.read_text()])) == to_text(int.from_bytes(data, 'big'), 8 * len(data))
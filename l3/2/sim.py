@@ -1,10 +1,19 @@
 from typing import List
-from random import random, randint
+from random import random, randint, seed as seed_random
 from time import sleep
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import argparse
+import heapq
+
+import numpy as np
 
 JAMMING_SIGNAL = float('inf')
 COLLISION_SIGNAL = float('-inf')
 
+# what a device did on a tick, as bits of the events of a trace
+SENT, DONE, JAMMED, COLLIDED, BACKED_OFF, ABORTED = 1, 2, 4, 8, 16, 32
+
 
 class Packet(object):
     """Represents a packet with value, time to live (ttl), and bleeding indicator."""
@@ -47,7 +56,54 @@ class Packet(object):
 
     def __add__(self, foreign):
         """Override the '+' operator to merge two packets with sum of their values and ttl."""
-        return Packet(value=self.value + foreign.value, ttl=self.ttl)
+        return Packet(value=merge_signals(self.value, foreign.value), ttl=self.ttl)
+
+
+def merge_signals(value, foreign):
+    """Merge two colliding signals into the sum of their values, the jamming signal drowning anything else."""
+    if value == JAMMING_SIGNAL or foreign == JAMMING_SIGNAL:
+        return JAMMING_SIGNAL
+    return value + foreign
+
+
+class Collisions(object):
+    """Interns the sums of colliding signals as small values, from the first value no device transmits.
+
+    Sums of collisions double along a long cable and soon become huge numbers.
+    Every sum is kept here once and the cable only holds the value it stands for,
+    so two collisions carry the same value exactly when their sums are equal.
+    """
+
+    def __init__(self, first: int):
+        """Initialize Collisions whose values start at first, above the value of every device."""
+        self.first = first
+        self.next = first
+        # sum of the signals behind every value, and value of every sum
+        self.sums = {}
+        self.values = {}
+
+    def __len__(self):
+        """Get the number of sums kept."""
+        return len(self.sums)
+
+    def merge(self, value, foreign):
+        """Merge two colliding signals as merge_signals() does, into the value of their sum."""
+        if value == JAMMING_SIGNAL or foreign == JAMMING_SIGNAL:
+            return JAMMING_SIGNAL
+        total = self.sums.get(value, value) + self.sums.get(foreign, foreign)
+        merged = self.values.get(total)
+        if merged is None:
+            merged = self.next
+            self.next += 1
+            self.sums[merged] = total
+            self.values[total] = merged
+        return merged
+
+    def prune(self, live) -> None:
+        """Forget the sums of every value but the given ones, the values still on the cable."""
+        live = set(live)
+        self.sums = {value: total for value, total in self.sums.items() if value in live}
+        self.values = {total: value for value, total in self.sums.items()}
 
 
 class Device(object):
@@ -176,6 +232,114 @@ def propagate(ethernet_cable: List[Packet]) -> bool:
     return ethernet_cable
 
 
+class Cable(object):
+    """Ethernet cable kept as parallel arrays of the value, ttl and bleeding indicator of every cell.
+
+    Values stay Python numbers in an object array: the jamming signal is infinite,
+    and without Collisions colliding signals keep adding up and soon outgrow any
+    fixed width integer. Indexing the cable gives a Packet or None like an
+    ethernet cable list.
+    """
+
+    def __init__(self, length: int, collisions: Collisions = None):
+        """Initialize an empty Cable of the given number of cells.
+
+        Args:
+            length: Number of cells.
+            collisions: Collisions interning the sums of colliding signals. Defaults to
+                plain sums, as propagate() merges them.
+        """
+        self.occupied = np.zeros(length, dtype=bool)
+        self.value = np.zeros(length, dtype=object)
+        self.ttl = np.zeros(length, dtype=np.int64)
+        self.bleeding = np.zeros(length, dtype=bool)
+        self.collisions = collisions
+        self.merge = merge_signals if collisions is None else collisions.merge
+
+    def __len__(self):
+        """Get the number of cells of the cable."""
+        return len(self.occupied)
+
+    def __getitem__(self, index):
+        """Get the Packet in a cell, None if it is empty."""
+        if not self.occupied[index]:
+            return None
+        packet = Packet(self.value[index], int(self.ttl[index]))
+        packet._bleeding = bool(self.bleeding[index])
+        return packet
+
+    def __setitem__(self, index, packet):
+        """Put a Packet in a cell, or empty it with None."""
+        self.occupied[index] = packet is not None
+        if packet is not None:
+            self.value[index] = packet.value
+            self.ttl[index] = packet.ttl
+            self.bleeding[index] = packet.bleeding
+
+    def __iter__(self):
+        """Iterate over the Packets of the cable, None for empty cells."""
+        return (self[i] for i in range(len(self)))
+
+    def propagate(self) -> "Cable":
+        """Propagate packets further along the cable, with the same result as propagate().
+
+        propagate() walks the cable from left to right, and the only thing a cell
+        passes on to the next one is whether it was skipped: a fresh packet that
+        writes into its right neighbour skips it. Along a run of fresh packets that
+        all write to the right, every other cell is therefore skipped starting from
+        the second, so every rule can be applied to the whole cable at once.
+
+        Returns:
+            Cable: the cable itself.
+        """
+        n = len(self)
+        occupied, value, ttl = self.occupied, self.value, self.ttl
+        fresh = occupied & ~self.bleeding
+        # a fresh packet writes into its right neighbour unless it holds the same value
+        writes = np.zeros(n, dtype=bool)
+        writes[:-1] = fresh[:-1] & (~occupied[1:] | (value[:-1] != value[1:]).astype(bool))
+        reached = np.zeros(n, dtype=bool)
+        reached[1:] = writes[:-1]
+        index = np.arange(n)
+        starts = np.where(reached & ~np.concatenate(([False], reached[:-1])), index, 0)
+        skipped = reached & ((index - np.maximum.accumulate(starts)) % 2 == 0)
+        processed = occupied & ~skipped
+        spreading = processed & fresh
+
+        new_occupied = occupied & ~(processed & (ttl < 2))
+        new_value = value.copy()
+        new_ttl = np.where(processed, ttl - 1, ttl)
+        new_bleeding = self.bleeding | processed
+
+        # skipped cells take the packet written by their left neighbour
+        right = np.flatnonzero(skipped)
+        source = right - 1
+        new_value[right] = value[source]
+        for cell in right[occupied[right]].tolist():
+            new_value[cell] = self.merge(value[cell - 1], value[cell])
+        new_ttl[right] = ttl[source]
+        new_occupied[right] = True
+        new_bleeding[right] = False
+
+        # then every spreading packet writes into its left neighbour as it stands
+        source = np.flatnonzero(spreading[1:]) + 1
+        left = source - 1
+        merged = new_occupied[left]
+        differs = ~merged | (new_value[left] != value[source]).astype(bool)
+        source, left, merged = source[differs], left[differs], merged[differs]
+        new_value[left[~merged]] = value[source[~merged]]
+        for cell in left[merged].tolist():
+            new_value[cell] = self.merge(value[cell + 1], new_value[cell])
+        new_ttl[left] = ttl[source]
+        new_occupied[left] = True
+        new_bleeding[left] = False
+
+        self.occupied, self.value, self.ttl, self.bleeding = new_occupied, new_value, new_ttl, new_bleeding
+        if self.collisions is not None and len(self.collisions) > 2 * n:
+            self.collisions.prune(new_value[new_occupied].tolist())
+        return self
+
+
 def can_send_packet(ethernet_cable: List[Packet], index: int) -> bool:
     """Check if a device can send a packet based on the current state of the ethernet cable.
 
@@ -191,48 +355,321 @@ def can_send_packet(ethernet_cable: List[Packet], index: int) -> bool:
     return False
 
 
-def print_ethernet_cable(ethernet_cable):
-    """Print the current state of the ethernet cable."""
-    for el in map(lambda x: str('#' if x.value == JAMMING_SIGNAL else (x.value if x.value in [1, 2] else '!')) if x is not None else ' ', ethernet_cable):
+def print_ethernet_cable(ethernet_cable, values=(1, 2)):
+    """Print the current state of the ethernet cable, '!' for anything but the values of the devices."""
+    for el in map(lambda x: str('#' if x.value == JAMMING_SIGNAL else (x.value if x.value in values else '!')) if x is not None else ' ', ethernet_cable):
         print(el, end=' ')
     print()
-    
-def simulate_csma_cd() -> None:
+
+
+def station_values(stations: int) -> List[int]:
+    """Get the value every device transmits.
+
+    Colliding signals only ever add up two different values, so with all values
+    between N - 1 and 2N - 2 no collision can look like the signal of a device.
+
+    Args:
+        stations: Number of devices.
+
+    Returns:
+        List: Value of every device, 1 and 2 for two devices.
+    """
+    first = max(1, stations - 1)
+    return list(range(first, first + stations))
+
+
+def make_devices(stations: int, cable_length: int, positions: List[int] = None) -> List[Device]:
+    """Connect devices to the ethernet cable, each with a frame ready to send.
+
+    Args:
+        stations: Number of devices.
+        cable_length: Number of cells of the ethernet cable.
+        positions: Position of every device. Defaults to evenly spread, 20 and 60 for two devices on 80 cells.
+
+    Returns:
+        List: Device objects.
+    """
+    if positions is None:
+        positions = [(2*i + 1) * cable_length // (2*stations) for i in range(stations)]
+    if len(positions) != stations or len(set(positions)) != stations:
+        raise ValueError("Every device needs its own position.")
+    devices = [Device(position) for position in positions]
+    for device, value in zip(devices, station_values(stations)):
+        device.currently_transmitted_value = value
+    return devices
+
+class Stats(object):
+    """Counters of what every device did during a simulation, cheap enough to keep on every tick."""
+
+    COUNTERS = ["frames", "successes", "collisions", "jams", "backoffs", "aborts"]
+
+    def __init__(self, count: int):
+        """Initialize Stats for the given number of devices, all with a frame ready at tick 1."""
+        self.counts = [dict(dict.fromkeys(self.COUNTERS, 0), frames=1) for _ in range(count)]
+        self.delays = [0 for _ in range(count)]
+        # tick at which the frame of a device got ready, and at which its last transmission started
+        self.ready = [1 for _ in range(count)]
+        self.sending = [None for _ in range(count)]
+        # events of every device since the flags were last taken
+        self.flags = [0 for _ in range(count)]
+
+    def take_flags(self) -> List[int]:
+        """Get the events of every device since the last call, as bits."""
+        flags, self.flags = self.flags, [0 for _ in self.flags]
+        return flags
+
+    def arrive(self, index: int, tick: int) -> None:
+        """Count a new frame getting ready on a device."""
+        self.counts[index]["frames"] += 1
+        self.ready[index] = tick
+
+    def send(self, index: int, tick: int) -> None:
+        """Count a device starting a transmission."""
+        self.sending[index] = tick
+        self.flags[index] |= SENT
+
+    def done(self, index: int, tick: int) -> None:
+        """Count a device finishing a transmission."""
+        self.counts[index]["successes"] += 1
+        self.delays[index] += self.sending[index] - self.ready[index]
+        self.sending[index] = None
+        self.flags[index] |= DONE
+
+    def jam(self, index: int, tick: int) -> None:
+        """Count a device sending the jamming signal, a collision if it was transmitting."""
+        self.counts[index]["jams"] += 1
+        self.flags[index] |= JAMMED
+        if self.sending[index] is not None:
+            self.counts[index]["collisions"] += 1
+            self.sending[index] = None
+            self.flags[index] |= COLLIDED
+
+    def backoff(self, index: int, tick: int) -> None:
+        """Count a device backing off."""
+        self.counts[index]["backoffs"] += 1
+        self.flags[index] |= BACKED_OFF
+
+    def abort(self, index: int, tick: int) -> None:
+        """Count a device giving up its frame."""
+        self.counts[index]["aborts"] += 1
+        self.sending[index] = None
+        self.flags[index] |= ABORTED
+
+    def result(self, simulation_duration: int, packet_length: int) -> dict:
+        """Gather the counters of the devices and of the whole cable.
+
+        Args:
+            simulation_duration: Number of ticks simulated.
+            packet_length: Number of ticks a frame takes.
+
+        Returns:
+            dict: the counters, the utilization as the share of ticks spent on frames
+                that got through and the access delay as the mean number of ticks
+                from a frame getting ready to the start of its successful transmission,
+                overall and under "devices" for every device.
+        """
+        devices = []
+        for counts, delay in zip(self.counts, self.delays):
+            device = dict(counts)
+            device["utilization"] = counts["successes"] * packet_length / simulation_duration
+            device["access_delay"] = delay / counts["successes"] if counts["successes"] else None
+            devices.append(device)
+        total = {name: sum(device[name] for device in devices) for name in self.COUNTERS}
+        total["ticks"] = simulation_duration
+        total["utilization"] = total["successes"] * packet_length / simulation_duration
+        total["access_delay"] = sum(self.delays) / total["successes"] if total["successes"] else None
+        total["devices"] = devices
+        return total
+
+
+TRACE_MAGIC = b"CSMACD01"
+TRACE_HEADER = np.dtype([("magic", "S8"), ("cable_length", "<i8"), ("stations", "<i8"), ("first_value", "<i8"),
+                         ("capacity", "<i8"), ("ticks", "<i8")])
+# a cell of a trace holds the index of the device whose signal it carries plus one, or one of these
+EMPTY_CELL, GARBLED_CELL, JAMMED_CELL = 0, 254, 255
+
+
+def trace_dtype(cable_length: int, stations: int) -> np.dtype:
+    """Get the record of a tick in a trace: the cells of the cable and the state and events of every device."""
+    return np.dtype([("cable", "u1", (cable_length,)), ("value", "<i8", (stations,)),
+                     ("until_next_packet", "<i8", (stations,)), ("exp_backoff_iterator", "<i2", (stations,)),
+                     ("jamming_mode", "?", (stations,)), ("events", "u1", (stations,))])
+
+
+class TraceRecorder(object):
+    """Writes the state of every tick of a simulation to a memory-mapped binary trace.
+
+    The file is a TRACE_HEADER followed by one trace_dtype() record per tick, all
+    allocated up front, so recording a tick is a handful of array copies. A cell
+    only changes value where a device or propagate() wrote it, so only those cells
+    are looked at again; the rest are copied from the tick before.
+    """
+
+    def __init__(self, path: str, cable_length: int, stations: int, first_value: int, capacity: int):
+        """Create the trace file.
+
+        Args:
+            path: Path of the trace.
+            cable_length: Number of cells of the ethernet cable.
+            stations: Number of devices.
+            first_value: Value transmitted by the first device, see station_values().
+            capacity: Number of ticks to make room for.
+        """
+        if stations >= GARBLED_CELL:
+            raise ValueError(f"A trace holds at most {GARBLED_CELL - 1} devices.")
+        self.header = np.memmap(path, TRACE_HEADER, "w+", shape=(1,))
+        self.header[0] = (TRACE_MAGIC, cable_length, stations, first_value, capacity, 0)
+        self.records = np.memmap(path, trace_dtype(cable_length, stations), "r+", offset=TRACE_HEADER.itemsize,
+                                 shape=(capacity,))
+        self.first_value = first_value
+        self.ticks = 0
+        self.cells = np.full(cable_length, EMPTY_CELL, dtype=np.uint8)
+        # plain views of the fields, so a tick is written without going through memmap again
+        records = self.records.view(np.ndarray)
+        self.cable, self.value = records["cable"], records["value"]
+        self.until_next_packet = records["until_next_packet"]
+        self.exp_backoff_iterator = records["exp_backoff_iterator"]
+        self.jamming_mode, self.events = records["jamming_mode"], records["events"]
+
+    def record(self, tick: int, ethernet_cable: Cable, devices: List[Device], events: List[int]) -> None:
+        """Write the state of the cable and of the devices at the end of a tick.
+
+        Args:
+            tick: Tick recorded, from 1.
+            ethernet_cable: Cable at the end of the tick.
+            devices: Device objects.
+            events: Events of every device on the tick, as bits.
+        """
+        i = tick - 1
+        occupied = ethernet_cable.occupied
+        written = np.flatnonzero(occupied & ~ethernet_cable.bleeding).tolist()
+        written += [device.ethernet_cable_pos for device in devices if occupied[device.ethernet_cable_pos]]
+        # colliding signals add up to more than any device value, see station_values()
+        garbage = self.first_value + len(devices)
+        if len(written) < 64:
+            value = ethernet_cable.value
+            for position in written:
+                v = value[position]
+                self.cells[position] = (JAMMED_CELL if v == JAMMING_SIGNAL else GARBLED_CELL) if v >= garbage \
+                    else v - self.first_value + 1
+        else:
+            values = ethernet_cable.value[written]
+            garbled = (values >= garbage).astype(bool)
+            cells = np.empty(len(values), dtype=np.uint8)
+            cells[~garbled] = values[~garbled].astype(np.int64) - (self.first_value - 1)
+            cells[garbled] = np.where((values[garbled] == JAMMING_SIGNAL).astype(bool), JAMMED_CELL, GARBLED_CELL)
+            self.cells[written] = cells
+        self.cells[~occupied] = EMPTY_CELL
+        self.cable[i] = self.cells
+        self.value[i] = [device.currently_transmitted_value for device in devices]
+        self.until_next_packet[i] = [device.until_next_packet for device in devices]
+        self.exp_backoff_iterator[i] = [device.exp_backoff_iterator for device in devices]
+        self.jamming_mode[i] = [device.jamming_mode for device in devices]
+        self.events[i] = events
+        self.ticks = tick
+
+    def close(self) -> None:
+        """Write the number of ticks recorded and flush the trace to disk."""
+        self.records.flush()
+        self.header[0]["ticks"] = self.ticks
+        self.header.flush()
+
+
+class Trace(object):
+    """Recorded simulation, read lazily: only the ticks looked at are read from disk."""
+
+    def __init__(self, path: str):
+        """Open a trace written by TraceRecorder.
+
+        Args:
+            path: Path of the trace.
+        """
+        header = np.memmap(path, TRACE_HEADER, "r", shape=(1,))[0]
+        if header["magic"] != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a CSMA/CD trace.")
+        self.cable_length, self.stations = int(header["cable_length"]), int(header["stations"])
+        self.first_value, self.ticks = int(header["first_value"]), int(header["ticks"])
+        self.records = np.memmap(path, trace_dtype(self.cable_length, self.stations), "r",
+                                 offset=TRACE_HEADER.itemsize, shape=(int(header["capacity"]),))[:self.ticks]
+
+    def __len__(self):
+        """Get the number of ticks recorded."""
+        return self.ticks
+
+    def __getitem__(self, tick: int):
+        """Get the record of a tick, from 1, see trace_dtype()."""
+        if not 1 <= tick <= self.ticks:
+            raise IndexError(f"Tick {tick} is not in the trace of {self.ticks} ticks.")
+        return self.records[tick - 1]
+
+    def events(self, event: int) -> np.ndarray:
+        """Get the ticks on which any device had the given event, one of SENT, DONE, JAMMED, COLLIDED, BACKED_OFF or ABORTED."""
+        return np.flatnonzero((self.records["events"] & event).any(axis=1)) + 1
+
+    def collisions(self) -> np.ndarray:
+        """Get the ticks on which a transmission ran into a collision."""
+        return self.events(COLLIDED)
+
+    def render(self, tick: int) -> str:
+        """Get the cable at a tick as print_ethernet_cable() prints it."""
+        symbols = {EMPTY_CELL: ' ', GARBLED_CELL: '!', JAMMED_CELL: '#'}
+        return ''.join(symbols.get(cell, str(self.first_value + cell - 1)) + ' ' for cell in self[tick]["cable"].tolist())
+
+
+def simulate_csma_cd(stations: int = 2, cable_length: int = 80, simulation_duration: int = 2500,
+                     probability: float = 0.0, packet_length: int = None, positions: List[int] = None,
+                     render_every: int = 1, seed: int = None, trace: str = None) -> dict:
     """Simulate the CSMA/CD protocol.
 
+    Every device starts with a frame ready to send, and on every tick an idle
+    device gets a new one with the given probability.
+
     Args:
-        ethernet_cable: List of Packet objects representing the initial state of the ethernet cable.
-        devices: List of Device objects representing the devices connected to the ethernet cable.
-        transmission_delay: Time delay between each step of the simulation.
+        stations: Number of devices.
+        cable_length: Number of cells of the ethernet cable.
+        simulation_duration: How many ticks will pass.
+        probability: Probability of an idle device to emit some data on a tick.
+        packet_length: Number of ticks a frame takes, at least 3. Defaults to twice the cable length.
+        positions: Position of every device. Defaults to evenly spread.
+        render_every: Print the ethernet cable every this many ticks, never if 0.
+        seed: Seed of the random module. Defaults to its current state.
+        trace: Path of a binary trace to record every tick to, see Trace. Defaults to none.
+
+    Returns:
+        dict: Counters of the devices and of the whole cable, see Stats.result().
     """
-    # packets propagating down a virtual ethernet cable
-    ethernet_cable = [None for _ in range(80)]
+    if seed is not None:
+        seed_random(seed)
+    values = station_values(stations)
+    # packets propagating down a virtual ethernet cable, collisions interned above the values of the devices
+    ethernet_cable = Cable(cable_length, Collisions(values[0] + stations))
     # initialize the devices
-    devices = [
-        Device(20),
-        Device(60)
-    ]
-    # how many iterations will pass
-    simulation_duration = 2500
-    # probability of a device to emit some data
-    probability = 0.4
+    devices = make_devices(stations, cable_length, positions)
     # packet length
-    packet_length = 2*len(ethernet_cable)
-
-    #ethernet_cable[20] = Packet(value=1, ttl=packet_length)
-    #ethernet_cable[60] = Packet(value=2, ttl=packet_length)
-    devices[0].currently_transmitted_value = 1
-    devices[1].currently_transmitted_value = 2
+    if packet_length is None:
+        packet_length = 2*len(ethernet_cable)
+    if packet_length < 3:
+        # a shorter frame leaves the cell of its device before the echo of its neighbours
+        # does, and the device would take the echo for a frame of its own finishing
+        raise ValueError(f"A frame takes at least 3 ticks, not {packet_length}.")
 
-    data = 10
-    for _ in range(1, simulation_duration+1):
+    stats = Stats(len(devices))
+    recorder = TraceRecorder(trace, cable_length, stations, values[0], simulation_duration) if trace else None
+    for tick in range(1, simulation_duration+1):
 
-        for device in devices:
+        for index, device in enumerate(devices):
 
             if device.exp_backoff_iterator > 15:
                 # abort
                 device.currently_transmitted_value = 0
                 device.reset_exp_backoff()
+                stats.abort(index, tick)
+
+            if probability and device.currently_transmitted_value == 0 and random() < probability:
+                # a new frame to send as soon as the cable is free
+                device.currently_transmitted_value = values[index]
+                device.until_next_packet = 0
+                stats.arrive(index, tick)
 
             t = ethernet_cable[device.ethernet_cable_pos]
 
@@ -241,6 +678,7 @@ def simulate_csma_cd() -> None:
                 if device.until_next_packet == 0 and device.currently_transmitted_value != 0:
                     ethernet_cable[device.ethernet_cable_pos] = Packet(value=device.currently_transmitted_value,
                                                                        ttl=packet_length)
+                    stats.send(index, tick)
                 else:
                     device.until_next_packet -= 1
 
@@ -251,6 +689,7 @@ def simulate_csma_cd() -> None:
                     device.currently_transmitted_value = 0
                     # reset the exponential backoff if there was any
                     device.reset_exp_backoff()
+                    stats.done(index, tick)
 
                 elif t.value not in [JAMMING_SIGNAL, device.currently_transmitted_value] and device.until_next_packet < 1:
                     # something is wrong and the jamming signal hasn't been transmitted yet
@@ -258,14 +697,375 @@ def simulate_csma_cd() -> None:
                                                                        ttl=packet_length)
                     device.exp_backoff_iterator += 1
                     device.perform_exponential_backoff(packet_length)
+                    stats.jam(index, tick)
+                    stats.backoff(index, tick)
 
                 if t.value == JAMMING_SIGNAL and device.until_next_packet == 0:
                     device.perform_exponential_backoff(packet_length)
+                    stats.backoff(index, tick)
+
+        ethernet_cable.propagate()
+        if recorder is not None:
+            recorder.record(tick, ethernet_cable, devices, stats.take_flags())
+        if render_every and tick % render_every == 0:
+            #sleep(0.008)
+            print_ethernet_cable(ethernet_cable, values)
+
+    if recorder is not None:
+        recorder.close()
+    return stats.result(simulation_duration, packet_length)
+
+
+class EventEngine(object):
+    """Runs the CSMA/CD protocol of simulate_csma_cd() from event to event.
+
+    Only the cells of the cable that hold a signal are stored, each as
+    [value, birth, ttl, fresh] where birth is the tick whose propagate() first
+    spreads it and removes it ttl - 1 ticks later. A fresh cell spreads once,
+    in the order propagate() would, so the cable only costs time where a
+    signal front moves. A device only runs at the ticks where it sends,
+    finishes, jams, backs off or aborts, or where a signal reaches it; the
+    ticks in between only count down its wait while its cell is free. While
+    frames arrive with some probability an idle device runs on every tick, so
+    it draws its random numbers in the same order as in simulate_csma_cd().
+    """
+
+    DEVICE = 0
+    PROPAGATE = 1
+
+    def __init__(self, cable_length: int, devices: List[Device], packet_length: int, collisions: Collisions = None,
+                 probability: float = 0.0):
+        """Initialize an EventEngine over an empty cable.
+
+        Args:
+            cable_length: Number of cells of the ethernet cable.
+            devices: Devices connected to the ethernet cable, each at its own position, with
+                the value of the frame they start with, which is the value of every new frame.
+            packet_length: Time to live of every packet put on the cable.
+            collisions: Collisions interning the sums of colliding signals. Defaults to plain sums.
+            probability: Probability of an idle device to emit some data on a tick.
+        """
+        self.cable_length = cable_length
+        self.devices = devices
+        self.packet_length = packet_length
+        self.probability = probability
+        self.values = [device.currently_transmitted_value for device in devices]
+        self.collisions = collisions
+        self.merge = merge_signals if collisions is None else collisions.merge
+        self.cells = {}
+        self.queue = []
+        # last tick every device has run until, and the version of its next event
+        self.last = [0 for _ in devices]
+        self.version = [0 for _ in devices]
+        self.at = {device.ethernet_cable_pos: index for index, device in enumerate(devices)}
+        if len(self.at) != len(devices):
+            raise ValueError("Devices must be at different positions.")
+        # (tick, index of the device, event) of everything the devices did
+        self.log = []
+        self.stats = Stats(len(devices))
+
+    def present(self, index: int, tick: int):
+        """Get the cell a device at index sees at the given tick, None if it is free."""
+        cell = self.cells.get(index)
+        if cell is not None and cell[1] + cell[2] - 1 >= tick:
+            return cell
+        return None
+
+    def write(self, index: int, value, ttl: int, birth: int) -> None:
+        """Put a fresh cell on the cable, waking up the device under it."""
+        device = self.at.get(index)
+        if device is not None and birth > self.last[device]:
+            self.catch_up(device, birth - 1)
+            self.wake(device, birth)
+        self.cells[index] = [value, birth, ttl, True]
+        heapq.heappush(self.queue, (birth, self.PROPAGATE, index, 0))
+
+    def spread(self, index: int, tick: int) -> None:
+        """Spread a fresh cell to its neighbours as the propagate() of the tick does."""
+        cell = self.cells.get(index)
+        if cell is None or cell[1] != tick or not cell[3]:
+            return
+        cell[3] = False
+        value, ttl = cell[0], cell[2]
+        if index > 0:
+            # the cell on the left was already reached by propagate() and may have bled out
+            left = self.cells.get(index - 1)
+            if left is None or left[1] + left[2] - 1 <= tick:
+                self.write(index - 1, value, ttl, tick + 1)
+            elif left[0] != value:
+                self.write(index - 1, self.merge(value, left[0]), ttl, tick + 1)
+        if index < self.cable_length - 1:
+            right = self.cells.get(index + 1)
+            if right is None or right[1] + right[2] - 1 < tick:
+                self.write(index + 1, value, ttl, tick + 1)
+            elif right[0] != value:
+                self.write(index + 1, self.merge(value, right[0]), ttl, tick + 1)
+        if self.collisions is not None and len(self.collisions) > 2 * self.cable_length:
+            self.collisions.prune(cell[0] for cell in self.cells.values())
+
+    def catch_up(self, index: int, tick: int) -> None:
+        """Count down the wait of a device over the ticks it did not run until the given one."""
+        device = self.devices[index]
+        start = self.last[index] + 1
+        if tick < start:
+            return
+        idle = tick - start + 1
+        cell = self.cells.get(device.ethernet_cable_pos)
+        if cell is not None:
+            busy = min(tick, cell[1] + cell[2] - 1) - max(start, cell[1]) + 1
+            idle -= max(busy, 0)
+        device.until_next_packet -= idle
+        self.last[index] = tick
+
+    def wake(self, index: int, tick: int) -> None:
+        """Run a device at the given tick in place of its next event."""
+        self.version[index] += 1
+        heapq.heappush(self.queue, (tick, self.DEVICE, index, self.version[index]))
+
+    def schedule(self, index: int, tick: int) -> None:
+        """Find the next tick after the given one at which a device does more than waiting."""
+        device = self.devices[index]
+        value = device.currently_transmitted_value
+        wait = device.until_next_packet
+        if device.exp_backoff_iterator > 15:
+            self.wake(index, tick + 1)
+            return
+        if value == 0:
+            if self.probability:
+                # a new frame may arrive on the next tick
+                self.wake(index, tick + 1)
+            else:
+                self.version[index] += 1
+            return
+        events = []
+        free = tick + 1
+        cell = self.present(device.ethernet_cable_pos, tick + 1)
+        if cell is not None:
+            start, end = max(tick + 1, cell[1]), cell[1] + cell[2] - 1
+            if cell[0] == value:
+                events.append(end)
+            elif cell[0] != JAMMING_SIGNAL and wait < 1:
+                events.append(start)
+            if cell[0] == JAMMING_SIGNAL and wait == 0:
+                events.append(start)
+            free = end + 1
+        if wait >= 0:
+            events.append(free + wait)
+        if events:
+            self.wake(index, min(events))
+        else:
+            self.version[index] += 1
+
+    def step(self, index: int, tick: int) -> None:
+        """Run a device at a tick exactly as simulate_csma_cd() does."""
+        device = self.devices[index]
+        position = device.ethernet_cable_pos
+        if device.exp_backoff_iterator > 15:
+            # abort
+            device.currently_transmitted_value = 0
+            device.reset_exp_backoff()
+            self.log.append((tick, index, "abort"))
+            self.stats.abort(index, tick)
+
+        if self.probability and device.currently_transmitted_value == 0 and random() < self.probability:
+            # a new frame to send as soon as the cable is free
+            device.currently_transmitted_value = self.values[index]
+            device.until_next_packet = 0
+            self.log.append((tick, index, "arrive"))
+            self.stats.arrive(index, tick)
+
+        t = self.present(position, tick)
+
+        if t is None:
+            if device.until_next_packet == 0 and device.currently_transmitted_value != 0:
+                self.cells[position] = [device.currently_transmitted_value, tick, self.packet_length, True]
+                heapq.heappush(self.queue, (tick, self.PROPAGATE, position, 0))
+                self.log.append((tick, index, "send"))
+                self.stats.send(index, tick)
+            else:
+                device.until_next_packet -= 1
+
+        if t is not None and device.currently_transmitted_value != 0:
+            value, ttl = t[0], t[2] - (tick - t[1])
+            if value == device.currently_transmitted_value and ttl == 1:
+                # the packet has finished transferring
+                device.currently_transmitted_value = 0
+                device.reset_exp_backoff()
+                self.log.append((tick, index, "done"))
+                self.stats.done(index, tick)
+
+            elif value not in [JAMMING_SIGNAL, device.currently_transmitted_value] and device.until_next_packet < 1:
+                self.cells[position] = [JAMMING_SIGNAL, tick, self.packet_length, True]
+                heapq.heappush(self.queue, (tick, self.PROPAGATE, position, 0))
+                device.exp_backoff_iterator += 1
+                device.perform_exponential_backoff(self.packet_length)
+                self.log.append((tick, index, "jam"))
+                self.stats.jam(index, tick)
+                self.stats.backoff(index, tick)
+
+            if value == JAMMING_SIGNAL and device.until_next_packet == 0:
+                device.perform_exponential_backoff(self.packet_length)
+                self.log.append((tick, index, "backoff"))
+                self.stats.backoff(index, tick)
+        self.last[index] = tick
+
+    def run(self, simulation_duration: int) -> None:
+        """Run the devices and the cable for ticks 1 to simulation_duration."""
+        for index in range(len(self.devices)):
+            self.wake(index, 1)
+        while self.queue and self.queue[0][0] <= simulation_duration:
+            tick, kind, index, version = heapq.heappop(self.queue)
+            if kind == self.PROPAGATE:
+                self.spread(index, tick)
+            elif version == self.version[index]:
+                self.catch_up(index, tick - 1)
+                self.step(index, tick)
+                self.schedule(index, tick)
+        for index in range(len(self.devices)):
+            self.catch_up(index, simulation_duration)
+
+
+def simulate_csma_cd_events(stations: int = 2, cable_length: int = 80, simulation_duration: int = 2500,
+                            probability: float = 0.0, packet_length: int = None, positions: List[int] = None,
+                            seed: int = None) -> dict:
+    """Simulate the CSMA/CD protocol of simulate_csma_cd() with the event-driven engine.
+
+    With the same seed both give the same counters, frames arriving on the same ticks.
+
+    Args:
+        stations: Number of devices.
+        cable_length: Number of cells of the ethernet cable.
+        simulation_duration: How many ticks will pass.
+        probability: Probability of an idle device to emit some data on a tick.
+        packet_length: Number of ticks a frame takes, at least 3. Defaults to twice the cable length.
+        positions: Position of every device. Defaults to evenly spread.
+        seed: Seed of the random module. Defaults to its current state.
+
+    Returns:
+        dict: Counters of the devices and of the whole cable, see Stats.result().
+    """
+    if seed is not None:
+        seed_random(seed)
+    devices = make_devices(stations, cable_length, positions)
+    if packet_length is None:
+        packet_length = 2*cable_length
+    if packet_length < 3:
+        # a shorter frame leaves the cell of its device before the echo of its neighbours
+        # does, and the device would take the echo for a frame of its own finishing
+        raise ValueError(f"A frame takes at least 3 ticks, not {packet_length}.")
+
+    engine = EventEngine(cable_length, devices, packet_length, Collisions(station_values(stations)[0] + stations),
+                         probability)
+    engine.run(simulation_duration)
+    return engine.stats.result(simulation_duration, packet_length)
+
+
+def replicate(config: dict) -> dict:
+    """Run one headless simulate_csma_cd() with the given keyword arguments."""
+    return simulate_csma_cd(render_every=0, **config)
+
+
+def sweep_csma_cd(probabilities: List[float], stations: List[int] = (2,), cable_lengths: List[int] = (80,),
+                  replications: int = 10, seed: int = None, workers: int = None, **config) -> List[dict]:
+    """Measure throughput against offered load over every combination of the parameters.
+
+    Every replication gets its own seed drawn from the master seed, so the sweep
+    gives the same results whatever the number of workers.
+
+    Args:
+        probabilities: Probabilities of an idle device to emit some data on a tick.
+        stations: Numbers of devices.
+        cable_lengths: Numbers of cells of the ethernet cable.
+        replications: Number of runs of every combination.
+        seed: Master seed of the sweep. Defaults to a fresh one.
+        workers: Number of processes running the replications. Defaults to one.
+        **config: Other keyword arguments of simulate_csma_cd().
+
+    Returns:
+        List: For every combination its parameters, the offered load in frames per
+            frame time, and the mean and standard deviation over the replications
+            of the throughput, which is the utilization, the mean access delay and
+            the mean numbers of collisions and aborts.
+    """
+    points = list(product(stations, cable_lengths, probabilities))
+    children = np.random.SeedSequence(seed).spawn(len(points) * replications)
+    seeds = [int(child.generate_state(1, np.uint64)[0]) for child in children]
+    jobs = [dict(config, stations=count, cable_length=length, probability=probability, seed=seeds[i*replications + j])
+            for i, (count, length, probability) in enumerate(points) for j in range(replications)]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(replicate, jobs, chunksize=max(1, len(jobs) // (4*workers))))
+    else:
+        results = list(map(replicate, jobs))
+
+    rows = []
+    for i, (count, length, probability) in enumerate(points):
+        runs = results[i*replications:(i + 1)*replications]
+        packet_length = config.get("packet_length") or 2*length
+        throughput = np.array([run["utilization"] for run in runs])
+        delays = [run["access_delay"] for run in runs if run["access_delay"] is not None]
+        rows.append({"stations": count, "cable_length": length, "probability": probability,
+                     "load": count * probability * packet_length, "throughput": float(throughput.mean()),
+                     "throughput_std": float(throughput.std()),
+                     "access_delay": float(np.mean(delays)) if delays else None,
+                     "collisions": float(np.mean([run["collisions"] for run in runs])),
+                     "aborts": float(np.mean([run["aborts"] for run in runs])), "replications": replications})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation of the CSMA/CD protocol.")
+    parser.add_argument("--stations", default="2", help="number of devices, comma separated to sweep")
+    parser.add_argument("--cable-length", default="80", help="cells of the ethernet cable, comma separated to sweep")
+    parser.add_argument("--probability", default="0", help="probability of an idle device to emit data on a tick, "
+                                                           "comma separated to sweep")
+    parser.add_argument("--duration", type=int, default=2500, help="ticks to simulate")
+    parser.add_argument("--packet-length", type=int, help="ticks of a frame, twice the cable length by default")
+    parser.add_argument("--render-every", type=int, default=1, help="print the cable every N ticks, never if 0")
+    parser.add_argument("--seed", type=int, help="seed of the simulation")
+    parser.add_argument("--sweep", action="store_true", help="measure throughput against load of every combination")
+    parser.add_argument("--replications", type=int, default=10, help="runs of every combination of a sweep")
+    parser.add_argument("--workers", type=int, help="processes running the replications of a sweep")
+    parser.add_argument("--trace", help="binary trace to record the simulation to")
+    parser.add_argument("--replay", help="binary trace to replay in place of simulating")
+    parser.add_argument("--tick", type=int, default=1, help="first tick to replay")
+    parser.add_argument("--collision", type=int, help="replay from the Nth collision, from 1, in place of a tick")
+    parser.add_argument("--ticks", type=int, default=1, help="number of ticks to replay")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay = Trace(args.replay)
+        tick = args.tick
+        if args.collision is not None:
+            collisions = replay.collisions()
+            if not 1 <= args.collision <= len(collisions):
+                parser.error(f"the trace has {len(collisions)} collisions")
+            tick = int(collisions[args.collision - 1])
+        for tick in range(tick, min(tick + args.ticks, len(replay) + 1)):
+            record = replay[tick]
+            print(f"{tick:>6} {replay.render(tick)}")
+            print(f"{'':>6} values {record['value'].tolist()} until_next_packet {record['until_next_packet'].tolist()} "
+                  f"exp_backoff_iterator {record['exp_backoff_iterator'].tolist()} "
+                  f"jamming_mode {record['jamming_mode'].tolist()} events {record['events'].tolist()}")
+        return
+
+    stations = [int(value) for value in args.stations.split(",")]
+    cable_lengths = [int(value) for value in args.cable_length.split(",")]
+    probabilities = [float(value) for value in args.probability.split(",")]
+    if not args.sweep:
+        print(simulate_csma_cd(stations[0], cable_lengths[0], args.duration, probabilities[0], args.packet_length,
+                               render_every=args.render_every, seed=args.seed, trace=args.trace))
+        return
+    print(f"{'stations':>8} {'cable':>6} {'p':>9} {'load':>8} {'throughput':>10} {'std':>7} {'delay':>9} "
+          f"{'collisions':>10} {'aborts':>7}")
+    for row in sweep_csma_cd(probabilities, stations, cable_lengths, args.replications, args.seed, args.workers,
+                             simulation_duration=args.duration, packet_length=args.packet_length):
+        delay = f"{row['access_delay']:>9.1f}" if row["access_delay"] is not None else f"{'-':>9}"
+        print(f"{row['stations']:>8} {row['cable_length']:>6} {row['probability']:>9g} {row['load']:>8.3f} "
+              f"{row['throughput']:>10.4f} {row['throughput_std']:>7.4f} {delay} {row['collisions']:>10.1f} "
+              f"{row['aborts']:>7.1f}")
 
-        propagate(ethernet_cable)
-        #sleep(0.008)
-        print_ethernet_cable(ethernet_cable)
 
 if __name__ == '__main__':
-    simulate_csma_cd()
+    main()
  
\ No newline at end of file
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from sim import (COLLIDED, JAMMED, JAMMING_SIGNAL, Cable, Collisions, Packet, Trace, propagate, simulate_csma_cd,
+                 simulate_csma_cd_events)
+
+
+def test_collisions_keep_equal_sums_equal():
+    collisions = Collisions(3)
+    three = collisions.merge(1, 2)
+    assert three == collisions.merge(2, 1) >= 3
+    assert collisions.merge(three, 1) == collisions.merge(2, 2) != three
+    assert collisions.merge(three, JAMMING_SIGNAL) == JAMMING_SIGNAL
+    collisions.prune([three])
+    assert collisions.merge(1, 2) == three
+
+
+def random_cable(rand, length):
+    cells = []
+    for _ in range(length):
+        packet = None
+        if rand.random() < 0.5:
+            packet = Packet(rand.choice([1, 2, 3, JAMMING_SIGNAL]), rand.randint(1, 6))
+            if rand.random() < 0.5:
+                packet.decrease_ttl()
+        cells.append(packet)
+    return cells
+
+
+def test_cable_propagates_as_a_list():
+    rand = random.Random(0)
+    for _ in range(100):
+        cells = random_cable(rand, rand.randint(1, 12))
+        cable = Cable(len(cells))
+        for i, packet in enumerate(cells):
+            cable[i] = packet
+        for _ in range(8):
+            propagate(cells)
+            cable.propagate()
+            assert ([None if packet is None else (packet.value, packet.ttl, packet.bleeding) for packet in cable]
+                    == [None if packet is None else (packet.value, packet.ttl, packet.bleeding) for packet in cells])
+
+
+def test_events_match_ticks():
+    for seed, (stations, length, positions, packet_length) in enumerate([(2, 80, None, None), (2, 30, [0, 29], 7),
+                                                                          (3, 50, [5, 6, 40], 20), (4, 17, None, 3)]):
+        result = simulate_csma_cd(stations, length, 2000, packet_length=packet_length, positions=positions,
+                                  render_every=0, seed=seed)
+        assert result["successes"] > 0
+        assert simulate_csma_cd_events(stations, length, 2000, packet_length=packet_length, positions=positions,
+                                       seed=seed) == result
+
+
+def test_long_cable():
+    result = simulate_csma_cd(2, 2000, 4000, render_every=0, seed=0)
+    assert result["collisions"] > 0
+    assert simulate_csma_cd_events(2, 2000, 4000, seed=0) == result
+
+
+def test_events_match_ticks_with_new_frames():
+    for seed in range(3):
+        result = simulate_csma_cd(3, 60, 3000, 0.005, render_every=0, seed=seed)
+        assert result["frames"] > 3
+        assert simulate_csma_cd_events(3, 60, 3000, 0.005, seed=seed) == result
+
+
+def test_frames_shorter_than_three_ticks_are_rejected():
+    for simulate in (simulate_csma_cd, simulate_csma_cd_events):
+        with pytest.raises(ValueError):
+            simulate(2, 32, 993, 0.05, 2, seed=292720)
+    assert (simulate_csma_cd(2, 32, 993, 0.05, 3, render_every=0, seed=292720)
+            == simulate_csma_cd_events(2, 32, 993, 0.05, 3, seed=292720))
+
+
+def test_trace_replays_the_printed_cable(tmp_path, capsys):
+    result = simulate_csma_cd(3, 30, 300, 0.01, seed=1, trace=str(tmp_path / "trace.bin"))
+    printed = capsys.readouterr().out.splitlines()
+    trace = Trace(str(tmp_path / "trace.bin"))
+    assert len(trace) == len(printed) == 300
+    assert [trace.render(tick) for tick in range(1, 301)] == printed
+    for event, count in ((JAMMED, "jams"), (COLLIDED, "collisions")):
+        assert sum(int((trace[tick]["events"] & event != 0).sum()) for tick in trace.events(event)) == result[count]
+    assert len(trace.collisions()) > 0
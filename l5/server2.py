@@ -1,10 +1,162 @@
-from flask import Flask, send_from_directory
+import argparse
+import gzip
+import mimetypes
+import os
+import stat
+from collections import OrderedDict
+from datetime import datetime, timezone
+from threading import Lock
+
+from flask import Flask, Response, abort, request, send_file, send_from_directory
+from werkzeug.security import safe_join
+
+ROOT = "./"
+# types worth compressing when no .gz variant is on disk
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
 
 app = Flask(__name__)
+app.config["STATIC_CACHE"] = None
+
+
+class StaticCache(object):
+    """Files kept in memory with their gzip variant, the least recently used evicted first
+
+    Every request stats the file and its .gz variant, so an entry is reloaded as
+    soon as the mtime or size of the file or the mtime of the variant changes.
+    Files bigger than max_file are not kept, they are sent from disk.
+    """
+
+    def __init__(self, root, max_bytes=64 << 20, max_file=1 << 20):
+        """
+        Args:
+            root (String): directory of the files
+            max_bytes (int, optional): bytes of all the entries, both variants counted. Defaults to 64 MiB.
+            max_file (int, optional): bytes of the biggest file to keep. Defaults to 1 MiB.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_file = max_file
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = Lock()
+
+    def get(self, path):
+        """Gives the entry of a file, loading it if it is missing or stale
+
+        Args:
+            path (String): path of the file under the root
+
+        Raises:
+            FileNotFoundError: the path is outside the root or not a file
+
+        Returns:
+            Tuple: path of the file on disk and its entry, None if it is too big to keep
+        """
+        full = safe_join(self.root, path)
+        if full is None:
+            raise FileNotFoundError(path)
+        info = os.stat(full)
+        if not stat.S_ISREG(info.st_mode):
+            raise FileNotFoundError(path)
+        gzip_mtime = self.gzip_mtime(full, info)
+        with self.lock:
+            entry = self.entries.get(full)
+            if (entry is not None and entry["mtime"] == info.st_mtime_ns and len(entry["body"]) == info.st_size
+                    and entry["gzip_mtime"] == gzip_mtime):
+                self.entries.move_to_end(full)
+                return full, entry
+        if info.st_size > self.max_file:
+            return full, None
+        entry = self.load(full, info, gzip_mtime)
+        with self.lock:
+            old = self.entries.pop(full, None)
+            if old is not None:
+                self.size -= old["bytes"]
+            self.entries[full] = entry
+            self.size += entry["bytes"]
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted["bytes"]
+        return full, entry
+
+    @staticmethod
+    def gzip_mtime(full, info):
+        """Gives the mtime of the .gz next to a file, None if there is none or it is older than the file"""
+        try:
+            mtime = os.stat(full + ".gz").st_mtime_ns
+        except OSError:
+            return None
+        return mtime if mtime >= info.st_mtime_ns else None
+
+    def load(self, full, info, gzip_mtime):
+        """Reads a file and its gzip variant, from a fresh .gz next to it or compressed once here"""
+        with open(full, "rb") as file:
+            body = file.read()
+        mimetype = mimetypes.guess_type(full)[0] or "application/octet-stream"
+        compressed = None
+        if gzip_mtime is not None:
+            try:
+                with open(full + ".gz", "rb") as file:
+                    compressed = file.read()
+            except OSError:
+                pass
+        if compressed is None and body and mimetype.startswith(COMPRESSIBLE):
+            compressed = gzip.compress(body, 9, mtime=0)
+        if compressed is not None and len(compressed) >= len(body):
+            compressed = None
+        etag = f"{info.st_mtime_ns:x}-{info.st_size:x}"
+        return {"body": body, "gzip": compressed, "mimetype": mimetype, "mtime": info.st_mtime_ns,
+                "gzip_mtime": gzip_mtime, "etag": etag,
+                # a .gz written again holds other bytes for the same file
+                "gzip_etag": etag + "-gzip" + (f"-{gzip_mtime:x}" if gzip_mtime is not None else ""),
+                "last_modified": datetime.fromtimestamp(info.st_mtime_ns // 10**9, timezone.utc),
+                "bytes": len(body) + len(compressed or b"")}
+
+
+def cached_response(entry):
+    """Builds the response of a cached file, gzipped if the client takes it, 304 if it is not modified"""
+    compressed = entry["gzip"] is not None and request.accept_encodings["gzip"] > 0
+    body = entry["gzip"] if compressed else entry["body"]
+    response = Response(body, mimetype=entry["mimetype"])
+    response.set_etag(entry["gzip_etag"] if compressed else entry["etag"])
+    response.last_modified = entry["last_modified"]
+    if entry["gzip"] is not None:
+        response.vary.add("Accept-Encoding")
+    if compressed:
+        response.content_encoding = "gzip"
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
 
 @app.route("/<path:path>")
 def serve_file(path):
-    return send_from_directory("./", path)
+    cache = app.config["STATIC_CACHE"]
+    if cache is None:
+        return send_from_directory(ROOT, path)
+    try:
+        full, entry = cache.get(path)
+    except OSError:
+        abort(404)
+    if entry is None:
+        # too big to keep: the WSGI server streams it, with sendfile where it has a file wrapper
+        return send_file(os.path.abspath(full), conditional=True, etag=True)
+    return cached_response(entry)
+
+
+if os.environ.get("STATIC_CACHE_MB"):
+    # production runs under a WSGI server with a sendfile file wrapper, e.g.
+    # STATIC_CACHE_MB=64 gunicorn --threads 8 server2:app
+    app.config["STATIC_CACHE"] = StaticCache(ROOT, int(os.environ["STATIC_CACHE_MB"]) << 20,
+                                             int(os.environ.get("STATIC_MAX_FILE_KB", 1024)) << 10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static file server for development, production runs under "
+                                                 "gunicorn with STATIC_CACHE_MB set.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=5000, help="port to listen on")
+    args = parser.parse_args()
+    app.run(host=args.host, port=args.port, threaded=True)
+
 
 if __name__ == "__main__":
-    app.run()
+    main()
@@ -0,0 +1,21 @@
+import gzip
+import os
+
+from server2 import StaticCache
+
+
+def test_a_new_gz_variant_is_served(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("<p>hello</p>" * 100)
+    (tmp_path / "page.html.gz").write_bytes(gzip.compress(page.read_bytes()))
+    cache = StaticCache(str(tmp_path))
+    _, entry = cache.get("page.html")
+    assert gzip.decompress(entry["gzip"]) == page.read_bytes()
+    # the variant is written again, later than the file and the first variant
+    (tmp_path / "page.html.gz").write_bytes(gzip.compress(page.read_bytes(), 1))
+    later = os.stat(page).st_mtime_ns + 10**9
+    os.utime(tmp_path / "page.html.gz", ns=(later, later))
+    _, fresh = cache.get("page.html")
+    assert fresh["gzip"] == (tmp_path / "page.html.gz").read_bytes() != entry["gzip"]
+    assert fresh["gzip_etag"] != entry["gzip_etag"] and fresh["etag"] == entry["etag"]
+    assert cache.get("page.html")[1] is fresh